@@ -8,24 +8,50 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import os
+import time
 from abc import ABC
-from typing import FrozenSet
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 import logging
-import sys
 
 from algorithm.right_based import (
     algorithm as rb_algo,
     metadata as rb_meta,
 )
-from common.data_types import TaskInstance, UnixtimeAssignments
-from common.time_interval import Minutes
+from algorithm.right_based.metadata import ResourcePool, RightBasedMetadata
+from algorithm.right_based.partition import chunk_components, partition_metadata
+from algorithm.right_based.plan_cache import PlanCache, fingerprint
+from common import instrumentation, pipeline
+from common.blocking import run_blocking
+from common.data_types import TaskInstance, UniqueTask, UnixtimeAssignments
+from common.instrumentation import RecordingSink
+from common.skyline_math import get_skyline_engine
+from common.time_interval import Minutes, TimeInterval
 from common.timestamp import Timestamp
 
 __ALL__ = ["SchedulingAlgorithm", "DummyTestPlan", "NullAlgorithm"]
 
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+# Pools are only split into chunks of at least this many tasks, smaller
+# chunks cost more to ship to a worker than to schedule
+_MIN_TASKS_PER_CHUNK = 1000
+
 logger: logging.Logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SchedulingAlgorithm(ABC):
     """
@@ -51,42 +77,315 @@ class SchedulingAlgorithm(ABC):
         """
         raise NotImplementedError()
 
+    async def run_batches(
+        self,
+        batches: AsyncIterator[FrozenSet[TaskInstance]],
+        task_pool: Optional[str] = None,
+    ) -> UnixtimeAssignments:
+        """
+        Plans the task instances of every batch together, as run() would
+        plan their union. Algorithms that can do useful work before the last
+        batch arrives should override this, by default the batches are
+        collected and passed to run().
+
+        `task_pool` names the planner's task pool the batches come from.
+        Task pools may share an algorithm, so anything an algorithm keeps
+        between runs should be kept per task pool.
+        """
+        tasks = set()
+        async for batch in batches:
+            tasks.update(batch)
+        return await self.run(frozenset(tasks))
+
+    def close(self) -> None:
+        """
+        Releases anything the algorithm keeps between runs (worker processes,
+        caches, ...). Called once the planner is done with the algorithm.
+        """
+        pass
+
 
 class RightBased(SchedulingAlgorithm):
+    """
+    Packs every task into the skyline of the resource pool it runs in,
+    starting each task as late as its window and the pool's capacity allow.
+
+    Pools don't share resources, so once their metadata is gathered they
+    are scheduled concurrently in a pool of `max_workers` processes (one
+    per CPU by default). With `partition`, a pool is further split into
+    groups of tasks that can't reach the same skyline bins (see
+    right_based.partition), which are scheduled concurrently as well.
+    With max_workers=0 everything is scheduled in the calling thread.
+
+    With `incremental`, each pool's plan and skyline are kept between runs,
+    separately for every task pool sharing the algorithm, and later runs
+    only re-place the tasks that appeared or changed since (see
+    right_based.algorithm.reschedule_tasks), in a thread. The skyline kept
+    honours `coarse_granularity` too.
+
+    A `coarse_granularity` speeds up the search for start times without
+    changing the plan, see right_based.algorithm.schedule_tasks.
+
+    With a `plan_cache`, a pool whose metadata, granularity, capacity and
+    skyline engine exactly match an earlier run gets that run's plan back
+    from disk.
+
+    Metadata is looked up batch by batch as run_batches() receives them.
+    Fetching the next batches meanwhile is up to the caller, the Planner
+    buffers up to TaskPoolConfig.max_pending_batches of them.
+
+    With a `time_budget`, tasks are only placed until the budget (counted
+    from the start of the run) is spent, and the partial plan holds the
+    highest-priority tasks. The tasks a pool didn't get to are kept along
+    with its skyline, and the next run places them first.
+    """
+
+    def __init__(
+        self,
+        skyline_engine: str = "dict",
+        granularity: TimeInterval = Minutes(1),
+        resource_pools: Optional[List[ResourcePool]] = None,
+        max_workers: Optional[int] = None,
+        partition: bool = True,
+        incremental: bool = False,
+        plan_cache: Optional[PlanCache] = None,
+        coarse_granularity: Optional[TimeInterval] = None,
+        time_budget: Optional[TimeInterval] = None,
+    ) -> None:
+        self.skyline_engine = skyline_engine
+        self.granularity = granularity
+        self.resource_pools: List[ResourcePool] = (
+            resource_pools if resource_pools is not None
+            else rb_meta.default_resource_pools()
+        )
+        self.max_workers = max_workers
+        self.partition = partition
+        self.incremental = incremental
+        self.plan_cache = plan_cache
+        self.coarse_granularity = coarse_granularity
+        self.time_budget = time_budget
+        # Part of the plan cache's keys
+        self._skyline_horizon = get_skyline_engine(skyline_engine).default_horizon
+        self._executor: Optional[Executor] = None
+        # By task pool and resource pool name
+        self._pool_states: Dict[Tuple[Optional[str], str], rb_algo.ScheduleState] = {}
+
     async def run(self, tasks: FrozenSet[TaskInstance]) -> UnixtimeAssignments:
-        granularity = Minutes(1)
-        (
-            spark_metadata,
-            presto_metadata,
-            spark_max_size,
-            presto_max_size,
-        ) = await asyncio.gather(
-            rb_meta.get_spark_metadata(tasks),
-            rb_meta.get_presto_metadata(tasks),
-            rb_meta.get_max_spark_resources(),
-            rb_meta.get_max_presto_resources(),
+        return await self.run_batches(pipeline.iterate([tasks]))
+
+    async def run_batches(
+        self,
+        batches: AsyncIterator[FrozenSet[TaskInstance]],
+        task_pool: Optional[str] = None,
+    ) -> UnixtimeAssignments:
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.monotonic() + self.time_budget.seconds
+        pools = self.resource_pools
+        capacities_lookup = asyncio.ensure_future(
+            asyncio.gather(*(pool.get_capacity() for pool in pools))
         )
+        tasks: Set[TaskInstance] = set()
+        metadata: List[Dict[UniqueTask, RightBasedMetadata]] = [{} for _ in pools]
+        try:
+            async for batch in batches:
+                tasks.update(batch)
+                with instrumentation.timer("right_based.metadata"):
+                    batch_metadata = await asyncio.gather(
+                        *(pool.get_metadata(batch) for pool in pools)
+                    )
+                for pool_metadata, pool_batch_metadata in zip(metadata, batch_metadata):
+                    pool_metadata.update(pool_batch_metadata)
+            capacities = await capacities_lookup
+        finally:
+            capacities_lookup.cancel()
+
+        pool_plans = await asyncio.gather(*(
+            self._schedule_pool(task_pool, pool, pool_metadata, capacity, deadline)
+            for pool, pool_metadata, capacity in zip(pools, metadata, capacities)
+        ))
+
+        with instrumentation.timer("right_based.assemble"):
+            plan = {}
+            for task_instance in tasks:
+                unique_task = task_instance.unique_task
+                for pool_plan in pool_plans:
+                    if unique_task in pool_plan:
+                        plan[task_instance] = task_instance.period_id.midnight + pool_plan[unique_task]
+                        break
+        return plan
+
+    def close(self) -> None:
+        self._pool_states.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def _schedule_pool(
+        self,
+        task_pool: Optional[str],
+        pool: ResourcePool,
+        metadata: Dict[UniqueTask, RightBasedMetadata],
+        capacity: float,
+        deadline: Optional[float],
+    ) -> Dict[UniqueTask, TimeInterval]:
+        logger.debug('%s Metadata Size %d', pool.name, len(metadata))
+        with instrumentation.timer(f"right_based.schedule.{pool.name}"):
+            previous = self._pool_states.pop((task_pool, pool.name), None)
+            if previous is not None and (self.incremental or previous.pending):
+                state = await self._run_in_thread(
+                    rb_algo.reschedule_tasks,
+                    metadata,
+                    previous,
+                    self.granularity,
+                    capacity,
+                    self.skyline_engine,
+                    self.coarse_granularity,
+                    deadline,
+                )
+                pool_plan, pending = dict(state.assignments), state.pending
+            else:
+                state = None
+                pool_plan, pending = await self._schedule_from_scratch(
+                    metadata, capacity, deadline
+                )
+            # The skyline is only worth keeping to replan incrementally or
+            # to carry on with the tasks there wasn't time for
+            if self.incremental or pending:
+                if state is None:
+                    state = await self._run_in_thread(
+                        rb_algo.ScheduleState.from_assignments,
+                        metadata,
+                        pool_plan,
+                        self.granularity,
+                        capacity,
+                        self.skyline_engine,
+                        pending,
+                        self.coarse_granularity,
+                    )
+                self._pool_states[(task_pool, pool.name)] = state
+        logger.debug('%s Plan Size %d | Pending %d', pool.name, len(pool_plan), len(pending))
+        return pool_plan
+
+    async def _schedule_from_scratch(
+        self,
+        metadata: Dict[UniqueTask, RightBasedMetadata],
+        capacity: float,
+        deadline: Optional[float],
+    ) -> Tuple[Dict[UniqueTask, TimeInterval], List[UniqueTask]]:
+        key = None
+        if self.plan_cache is not None:
+            key = fingerprint(
+                metadata, self.granularity, capacity, self.skyline_engine, self._skyline_horizon
+            )
+            cached = self.plan_cache.get(key)
+            instrumentation.increment(
+                "right_based.plan_cache." + ("hits" if cached is not None else "misses")
+            )
+            if cached is not None:
+                return cached, []
+
+        executor = self._get_executor()
+        if executor is None or not metadata:
+            pool_plan, pending = rb_algo.schedule_tasks_until(
+                metadata, granularity=self.granularity, max_size=capacity,
+                engine=self.skyline_engine, coarse_granularity=self.coarse_granularity,
+                deadline=deadline,
+            )
+        else:
+            pool_plan, pending = {}, []
+            for chunk_plan, chunk_pending in await asyncio.gather(*(
+                self._schedule_in_executor(executor, chunk, capacity, deadline)
+                for chunk in self._split_pool(metadata)
+            )):
+                pool_plan.update(chunk_plan)
+                pending.extend(chunk_pending)
+
+        # Partial plans would be served to runs that have time to finish
+        if self.plan_cache is not None and not pending:
+            self.plan_cache.put(key, pool_plan)
+        return pool_plan, pending
 
-        logger.debug(f'Presto Metadata Size {len(presto_metadata)}')
-        presto_plan = rb_algo.schedule_tasks(
-            presto_metadata, granularity=granularity, max_size=presto_max_size
+    def _split_pool(
+        self, metadata: Dict[UniqueTask, RightBasedMetadata]
+    ) -> List[Dict[UniqueTask, RightBasedMetadata]]:
+        num_chunks = min(
+            self._num_workers(), -(-len(metadata) // _MIN_TASKS_PER_CHUNK)
         )
-        logger.debug(f'Presto Plan Size {len(presto_plan)}')
+        if not self.partition or num_chunks <= 1:
+            return [metadata]
+        with instrumentation.timer("right_based.partition"):
+            components = partition_metadata(metadata, self.granularity)
+            instrumentation.increment("right_based.components", len(components))
+            return chunk_components(components, num_chunks)
 
-        logger.debug(f'Spark Metadata Size {len(spark_metadata)}')
-        spark_plan = rb_algo.schedule_tasks(
-            spark_metadata, granularity=granularity, max_size=spark_max_size
+    async def _schedule_in_executor(
+        self,
+        executor: Executor,
+        metadata: Dict[UniqueTask, RightBasedMetadata],
+        capacity: float,
+        deadline: Optional[float],
+    ) -> Tuple[Dict[UniqueTask, TimeInterval], List[UniqueTask]]:
+        sink = instrumentation.get_sink()
+        result, recorded = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            functools.partial(
+                _run_recorded,
+                sink.enabled,
+                rb_algo.schedule_tasks_until,
+                metadata,
+                self.granularity,
+                capacity,
+                self.skyline_engine,
+                self.coarse_granularity,
+                deadline,
+            ),
         )
-        logger.debug(f'Spark Metadata Size {len(spark_plan)}')
-
-        plan = {}
-        for task_instance in tasks:
-            unique_task = task_instance.unique_task
-            if unique_task in spark_plan:
-                plan[task_instance] = task_instance.period_id.midnight + spark_plan[unique_task]
-            elif unique_task in presto_plan:
-                plan[task_instance] = task_instance.period_id.midnight + presto_plan[unique_task]
-        return plan
+        if recorded is not None:
+            sink.merge(recorded)
+        return result
+
+    async def _run_in_thread(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Runs work on a pool's kept state off the event loop, so that other
+        pools go on with their lookups meanwhile. The state stays in this
+        process, so it runs in a thread rather than a worker process, or
+        in the calling thread with max_workers=0.
+        """
+        if self.max_workers == 0:
+            return function(*args)
+        sink = instrumentation.get_sink()
+        result, recorded = await run_blocking(_run_recorded, sink.enabled, function, *args)
+        if recorded is not None:
+            sink.merge(recorded)
+        return result
+
+    def _num_workers(self) -> int:
+        return self.max_workers or os.cpu_count() or 1
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.max_workers == 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._num_workers())
+        return self._executor
+
+
+def _run_recorded(
+    instrumented: bool, function: Callable[..., T], *args: Any,
+) -> Tuple[T, Optional[RecordingSink]]:
+    """
+    Runs `function` in a worker process or thread. The planner's sink
+    doesn't exist in a worker process and isn't thread-safe, so
+    measurements are recorded locally and shipped back. time.monotonic()
+    is system-wide, so deadlines hold there too.
+    """
+    if not instrumented:
+        return function(*args), None
+    sink = RecordingSink()
+    with instrumentation.use_sink(sink):
+        result = function(*args)
+    return result, sink
 
 
 class NullAlgorithm(SchedulingAlgorithm):
@@ -7,52 +7,334 @@
 
 from __future__ import annotations
 
-from typing import Dict
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Union
 import logging
-import sys
+import time
 
+from common import instrumentation
 from common.data_types import UniqueTask
-from common.skyline_math import SkylineTracker
-from common.time_interval import TimeInterval
+from common.skyline_hierarchy import CoarseToFineSkylineTracker
+from common.skyline_math import (
+    SkylineBlock,
+    SkylineShape,
+    SkylineTracker,
+    get_skyline_tracker,
+    skyline_shape,
+)
+from common.time_interval import Seconds, TimeInterval
 from algorithm.right_based.metadata import RightBasedMetadata
+from algorithm.right_based.partition import reachable_bins
 
-__all__ = ["schedule_tasks"]
+if TYPE_CHECKING:
+    from algorithm.right_based.columnar import ColumnarMetadata
+
+__all__ = [
+    "schedule_tasks",
+    "schedule_tasks_until",
+    "reschedule_tasks",
+    "ScheduleState",
+]
 
 
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+# What _place_tasks needs of a task: the task, its window, its skyline and
+# the key of its group of identical tasks
+_Row = Tuple[UniqueTask, TimeInterval, TimeInterval, List[SkylineBlock], Tuple]
+
+
+@dataclass
+class ScheduleState:
+    """
+    Everything reschedule_tasks needs to pick up where a previous run left
+    off: the metadata it planned, the start times it accepted, the global
+    skyline holding exactly those jobs, and the tasks it ran out of time
+    for before trying to place them. With a `coarse_granularity` the
+    skyline is a CoarseToFineSkylineTracker.
+    """
+
+    metadata: Dict[UniqueTask, RightBasedMetadata]
+    assignments: Dict[UniqueTask, TimeInterval]
+    skyline: SkylineTracker
+    granularity: TimeInterval
+    max_size: float
+    engine: str
+    pending: Set[UniqueTask] = field(default_factory=set)
+    coarse_granularity: Optional[TimeInterval] = None
+
+    @classmethod
+    def from_assignments(
+        cls,
+        metadata: Dict[UniqueTask, RightBasedMetadata],
+        assignments: Dict[UniqueTask, TimeInterval],
+        granularity: TimeInterval,
+        max_size: float,
+        engine: str = "dict",
+        pending: Iterable[UniqueTask] = (),
+        coarse_granularity: Optional[TimeInterval] = None,
+    ) -> ScheduleState:
+        """
+        Rebuilds the skyline of a plan made by schedule_tasks
+        """
+        skyline = _global_skyline(granularity, max_size, engine, coarse_granularity)
+        for task, start_time in assignments.items():
+            skyline.add_job(start_time, metadata[task].skyline)
+        return cls(
+            dict(metadata), dict(assignments), skyline, granularity, max_size, engine,
+            set(pending), coarse_granularity,
+        )
+
+
 def schedule_tasks(
-    metadata: Dict[UniqueTask, RightBasedMetadata],
+    metadata: Union[Dict[UniqueTask, RightBasedMetadata], ColumnarMetadata],
     granularity: TimeInterval,
     max_size: float,
+    engine: str = "dict",
+    coarse_granularity: Optional[TimeInterval] = None,
+    deadline: Optional[float] = None,
 ) -> Dict[UniqueTask, TimeInterval]:
-    global_skyline: SkylineTracker = SkylineTracker(
-        granularity=granularity, max_size=max_size
+    """
+    `metadata` is either a dict or, for large pools, the equivalent
+    right_based.columnar.ColumnarMetadata.
+
+    `engine` selects the SkylineTracker implementation used for the global
+    skyline, see common.skyline_math.get_skyline_tracker
+
+    With a `coarse_granularity` (a multiple of `granularity`, e.g. Hours(1)
+    over Minutes(1)), start times are first searched on a conservative
+    skyline at that granularity and refined at `granularity` only where it
+    has no room, see common.skyline_hierarchy. The plan is the same.
+
+    Placement stops at `deadline` (a time.monotonic() value), see
+    schedule_tasks_until.
+    """
+    return schedule_tasks_until(
+        metadata, granularity, max_size, engine, coarse_granularity, deadline
+    )[0]
+
+
+def schedule_tasks_until(
+    metadata: Union[Dict[UniqueTask, RightBasedMetadata], ColumnarMetadata],
+    granularity: TimeInterval,
+    max_size: float,
+    engine: str = "dict",
+    coarse_granularity: Optional[TimeInterval] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[Dict[UniqueTask, TimeInterval], List[UniqueTask]]:
+    """
+    schedule_tasks, but it stops placing tasks once time.monotonic() reaches
+    `deadline` and also returns the tasks it didn't get to.
+
+    Tasks are placed in priority order (latest windows first), so the
+    partial plan holds the most important tasks, exactly as the full plan
+    would. Passing it along with the remaining tasks to ScheduleState lets
+    reschedule_tasks carry on from there.
+    """
+    global_skyline = _global_skyline(granularity, max_size, engine, coarse_granularity)
+    assignments: Dict[UniqueTask, TimeInterval] = {}
+    pending = _place_tasks(_placement_rows(metadata), global_skyline, assignments, deadline)
+    return assignments, pending
+
+
+def reschedule_tasks(
+    metadata: Dict[UniqueTask, RightBasedMetadata],
+    previous: Optional[ScheduleState],
+    granularity: TimeInterval,
+    max_size: float,
+    engine: str = "dict",
+    coarse_granularity: Optional[TimeInterval] = None,
+    deadline: Optional[float] = None,
+) -> ScheduleState:
+    """
+    Plans `metadata` starting from the state of a previous run instead of
+    from scratch. Tasks that are gone or whose metadata changed are taken
+    off the previous skyline, every other accepted task keeps its start
+    time, and only new and changed tasks are placed, so the cost follows
+    the churn rather than the pool size. Tasks rejected last time are only
+    retried when bins they can reach were freed. Tasks a previous run
+    didn't get to before its deadline are placed now.
+
+    The plan is not necessarily the one schedule_tasks would make from
+    scratch. Without a compatible previous state (none, or one made with
+    another granularity, capacity, engine or coarse granularity)
+    everything is planned anew.
+
+    `previous` is updated in place and returned.
+    """
+    if (
+        previous is None
+        or previous.granularity != granularity
+        or previous.max_size != max_size
+        or previous.engine != engine
+        or previous.coarse_granularity != coarse_granularity
+    ):
+        assignments, pending = schedule_tasks_until(
+            metadata, granularity, max_size, engine, coarse_granularity, deadline
+        )
+        return ScheduleState.from_assignments(
+            metadata, assignments, granularity, max_size, engine, pending, coarse_granularity
+        )
+
+    skyline, assignments = previous.skyline, previous.assignments
+    freed: List[Tuple[int, int]] = []
+    for task, start_time in list(assignments.items()):
+        if metadata.get(task) != previous.metadata[task]:
+            blocks = previous.metadata[task].skyline
+            skyline.remove_job(start_time, blocks)
+            del assignments[task]
+            freed.append(reachable_bins(
+                RightBasedMetadata(start_time, start_time, blocks), granularity
+            ))
+    freed_starts, freed_ends = _merge_spans(freed)
+
+    def needs_placing(task: UniqueTask, meta: RightBasedMetadata) -> bool:
+        if task in assignments:
+            return False
+        if task in previous.pending or previous.metadata.get(task) != meta:
+            return True
+        # Rejected last time, it can only fit now if some of the bins it
+        # can reach were freed
+        first_bin, last_bin = reachable_bins(meta, granularity)
+        i = bisect_right(freed_starts, last_bin) - 1
+        return i >= 0 and freed_ends[i] >= first_bin
+
+    to_place = [(task, meta) for task, meta in metadata.items() if needs_placing(task, meta)]
+    removed = len(freed)
+    logger.debug("Rescheduling: removed %d, placing %d", removed, len(to_place))
+    instrumentation.increment("reschedule_tasks.tasks_removed", removed)
+    previous.pending = set(
+        _place_tasks(_placement_rows(dict(to_place)), skyline, assignments, deadline)
     )
+    previous.metadata = dict(metadata)
+    return previous
+
 
-    task_metadata_tuples = sorted(metadata.items(), key=lambda x: x[1], reverse=True)
-    assignments = {}
-    for i, (task, meta) in enumerate(task_metadata_tuples):
+def _global_skyline(
+    granularity: TimeInterval,
+    max_size: float,
+    engine: str,
+    coarse_granularity: Optional[TimeInterval],
+) -> SkylineTracker:
+    skyline = get_skyline_tracker(engine, granularity=granularity, max_size=max_size)
+    if coarse_granularity is not None:
+        skyline = CoarseToFineSkylineTracker(skyline, coarse_granularity)
+    return skyline
+
+
+def _merge_spans(spans: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """
+    Merges overlapping [first, last] spans into sorted, disjoint ones,
+    returned as their starts and ends
+    """
+    starts: List[int] = []
+    ends: List[int] = []
+    for first, last in sorted(spans):
+        if ends and first <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], last)
+        else:
+            starts.append(first)
+            ends.append(last)
+    return starts, ends
+
+
+def _placement_rows(
+    metadata: Union[Dict[UniqueTask, RightBasedMetadata], ColumnarMetadata],
+) -> List[_Row]:
+    """
+    The tasks in the order they are placed: latest windows first, tasks
+    with equal windows in their original order. Both containers are sorted
+    on integer keys rather than through RightBasedMetadata's comparisons.
+    """
+    if isinstance(metadata, dict):
+        ordered = sorted(
+            metadata.items(),
+            key=lambda x: (x[1].min_start_time.seconds, x[1].max_start_time.seconds),
+            reverse=True,
+        )
+        # Pools share a handful of skyline lists between many tasks
+        shapes: Dict[int, SkylineShape] = {}
+        rows = []
+        for task, meta in ordered:
+            shape = shapes.get(id(meta.skyline))
+            if shape is None:
+                shape = shapes[id(meta.skyline)] = skyline_shape(meta.skyline)
+            rows.append((
+                task,
+                meta.min_start_time,
+                meta.max_start_time,
+                meta.skyline,
+                (meta.min_start_time.seconds, meta.max_start_time.seconds, shape),
+            ))
+        return rows
+
+    shape_ids, skylines = metadata.skylines()
+    min_start, max_start = metadata.min_start.tolist(), metadata.max_start.tolist()
+    intervals = {seconds: Seconds(seconds) for seconds in {*min_start, *max_start}}
+    # One pass over the tasks, which may be built on access
+    tasks = list(metadata.tasks)
+    return [
+        (
+            tasks[i],
+            intervals[min_start[i]],
+            intervals[max_start[i]],
+            skylines[shape_ids[i]],
+            (min_start[i], max_start[i], shape_ids[i]),
+        )
+        for i in metadata.placement_order().tolist()
+    ]
+
+
+def _place_tasks(
+    rows: List[_Row],
+    global_skyline: SkylineTracker,
+    assignments: Dict[UniqueTask, TimeInterval],
+    deadline: Optional[float] = None,
+) -> List[UniqueTask]:
+    """
+    Places tasks latest window first at the latest start time the skyline
+    allows, recording accepted tasks in `assignments`. Returns the tasks
+    left unvisited when `deadline` was reached.
+
+    Tasks with identical windows and skylines are grouped. The skyline only
+    fills up while tasks are placed, so a member of a group can't start any
+    later than the previous member did, and can't fit at all once a member
+    didn't. Each search resumes from where the group's last member landed,
+    which gives the same plan without repeating the probes that failed.
+    """
+    sink = instrumentation.get_sink()
+    probes, bins_touched = global_skyline.probes, global_skyline.bins_touched
+    resume_from: Dict[Tuple, Optional[TimeInterval]] = {}
+    accepted = 0
+    visited = len(rows)
+    for i, (task, min_start, max_start, skyline, group) in enumerate(rows):
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.debug("Out of time after %d/%d tasks", i, len(rows))
+            visited = i
+            break
         if i % 1000 == 0:
-            logger.debug(f"Scheduled {i}/{len(task_metadata_tuples)}, {len(assignments)} accepted")
-        start_time = meta.max_start_time
-        while start_time >= meta.min_start_time:
-            if global_skyline.can_add(start_time, meta.skyline):
-                global_skyline.add_job(start_time, meta.skyline)
-                assignments[task] = start_time
-                break
-            elif can_decrement(start_time, granularity):
-                start_time -= granularity
-            else:
-                break
-    return assignments
-
-
-def can_decrement(time: TimeInterval, interval: TimeInterval) -> bool:
-    try:
-        _ = time - interval
-        return True
-    except Exception:
-        return False
+            logger.debug("Scheduled %d/%d, %d accepted", i, len(rows), accepted)
+        probes_before = global_skyline.probes
+        max_start = resume_from.get(group, max_start)
+        start_time = None
+        if max_start is not None:
+            start_time = global_skyline.latest_feasible_start(skyline, min_start, max_start)
+            resume_from[group] = start_time
+        if start_time is not None:
+            global_skyline.add_job(start_time, skyline)
+            assignments[task] = start_time
+            accepted += 1
+        if sink.enabled:
+            sink.observe(
+                "schedule_tasks.probes_per_task", global_skyline.probes - probes_before
+            )
+
+    sink.increment("schedule_tasks.task_groups", len(resume_from))
+    sink.increment("schedule_tasks.tasks_accepted", accepted)
+    sink.increment("schedule_tasks.tasks_rejected", visited - accepted)
+    sink.increment("schedule_tasks.tasks_pending", len(rows) - visited)
+    sink.increment("schedule_tasks.skyline_probes", global_skyline.probes - probes)
+    sink.increment("schedule_tasks.bins_touched", global_skyline.bins_touched - bins_touched)
+    return [row[0] for row in rows[visited:]]
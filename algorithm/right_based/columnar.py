@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import UniqueTask
+from common.skyline_math import SkylineBlock, SkylineShape
+from common.time_interval import Seconds
+
+__all__ = ["ColumnarMetadata"]
+
+
+class ColumnarMetadata:
+    """
+    The metadata of a right-based pool as a struct of arrays, an
+    alternative to Dict[UniqueTask, RightBasedMetadata] for large pools
+    that schedule_tasks accepts directly.
+
+    Task i starts between min_start[i] and max_start[i] (in seconds) and
+    its skyline is the blocks block_offsets[i] to block_offsets[i + 1] of
+    block_durations (in seconds) and block_sizes, CSR style. Rows keep the
+    order they were given in, which breaks ties exactly like the insertion
+    order of a dict does.
+    """
+
+    def __init__(
+        self,
+        tasks: Sequence[UniqueTask],
+        min_start: np.ndarray,
+        max_start: np.ndarray,
+        block_offsets: np.ndarray,
+        block_durations: np.ndarray,
+        block_sizes: np.ndarray,
+    ) -> None:
+        # Any sequence will do, e.g. one that builds tasks on demand
+        self.tasks: Sequence[UniqueTask] = tasks
+        self.min_start: np.ndarray = np.asarray(min_start, dtype=np.int64)
+        self.max_start: np.ndarray = np.asarray(max_start, dtype=np.int64)
+        self.block_offsets: np.ndarray = np.asarray(block_offsets, dtype=np.int64)
+        self.block_durations: np.ndarray = np.asarray(block_durations, dtype=np.int64)
+        self.block_sizes: np.ndarray = np.asarray(block_sizes, dtype=np.float64)
+        n = len(self.tasks)
+        assert self.min_start.shape == self.max_start.shape == (n,)
+        assert self.block_offsets.shape == (n + 1,) and self.block_offsets[0] == 0
+        assert (
+            self.block_durations.shape == self.block_sizes.shape
+            == (self.block_offsets[-1],)
+        )
+        assert np.all(self.max_start >= self.min_start)
+        assert np.all(self.block_sizes >= 0), "Skyline size must be positive"
+
+    @classmethod
+    def from_metadata(
+        cls, metadata: Dict[UniqueTask, RightBasedMetadata]
+    ) -> ColumnarMetadata:
+        block_counts = np.fromiter(
+            (len(meta.skyline) for meta in metadata.values()), np.int64, len(metadata)
+        )
+        block_offsets = np.zeros(len(metadata) + 1, dtype=np.int64)
+        np.cumsum(block_counts, out=block_offsets[1:])
+        num_blocks = int(block_offsets[-1])
+        return cls(
+            tasks=list(metadata),
+            min_start=np.fromiter(
+                (meta.min_start_time.seconds for meta in metadata.values()),
+                np.int64, len(metadata),
+            ),
+            max_start=np.fromiter(
+                (meta.max_start_time.seconds for meta in metadata.values()),
+                np.int64, len(metadata),
+            ),
+            block_offsets=block_offsets,
+            block_durations=np.fromiter(
+                (block.duration.seconds for meta in metadata.values() for block in meta.skyline),
+                np.int64, num_blocks,
+            ),
+            block_sizes=np.fromiter(
+                (block.size for meta in metadata.values() for block in meta.skyline),
+                np.float64, num_blocks,
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def to_metadata(self) -> Dict[UniqueTask, RightBasedMetadata]:
+        """
+        Rows with identical skylines share a single list of blocks
+        """
+        shape_ids, skylines = self.skylines()
+        return {
+            task: RightBasedMetadata(
+                min_start_time=Seconds(min_start),
+                max_start_time=Seconds(max_start),
+                skyline=skylines[shape_id],
+            )
+            for task, min_start, max_start, shape_id in zip(
+                self.tasks, self.min_start.tolist(), self.max_start.tolist(), shape_ids
+            )
+        }
+
+    def placement_order(self) -> np.ndarray:
+        """
+        The rows in the order schedule_tasks places them: latest windows
+        first, rows with equal windows in their original order
+        """
+        # lexsort is stable and sorts by its last key first
+        return np.lexsort((-self.max_start, -self.min_start))
+
+    def shapes(self) -> Tuple[List[int], List[SkylineShape]]:
+        """
+        The distinct skyline shapes of the pool, and the index of each
+        row's shape in them
+        """
+        durations = self.block_durations.tolist()
+        sizes = self.block_sizes.tolist()
+        offsets = self.block_offsets.tolist()
+        shape_index: Dict[SkylineShape, int] = {}
+        shape_ids = [
+            shape_index.setdefault(
+                tuple(zip(durations[first:last], sizes[first:last])), len(shape_index)
+            )
+            for first, last in zip(offsets, offsets[1:])
+        ]
+        return shape_ids, list(shape_index)
+
+    def skylines(self) -> Tuple[List[int], List[List[SkylineBlock]]]:
+        """
+        shapes(), with every distinct shape built into blocks once
+        """
+        shape_ids, shapes = self.shapes()
+        return shape_ids, [
+            [SkylineBlock(Seconds(duration), size) for duration, size in shape]
+            for shape in shapes
+        ]
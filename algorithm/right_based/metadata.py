@@ -7,7 +7,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, FrozenSet, List, Tuple
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Tuple
 
 from common.data_types import TaskInstance, UniqueTask
 from common.skyline_math import SkylineBlock
@@ -38,6 +38,31 @@ class RightBasedMetadata:
         return self.order_tuple >= other.order_tuple
 
 
+@dataclass
+class ResourcePool:
+    """
+    A named pool of resources that right-based tasks are packed into. Each
+    pool has its own skyline, so pools are scheduled independently.
+    """
+
+    name: str
+    get_metadata: Callable[
+        [FrozenSet[TaskInstance]], Awaitable[Dict[UniqueTask, RightBasedMetadata]]
+    ]
+    get_capacity: Callable[[], Awaitable[float]]
+
+
+def default_resource_pools() -> List[ResourcePool]:
+    """
+    When a task shows up in more than one pool, the first pool's assignment
+    is used
+    """
+    return [
+        ResourcePool("spark", get_spark_metadata, get_max_spark_resources),
+        ResourcePool("presto", get_presto_metadata, get_max_presto_resources),
+    ]
+
+
 async def get_max_spark_resources() -> float:
     return 3
 
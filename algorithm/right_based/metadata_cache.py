@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Caches in front of a ResourcePool's getters, whose remote lookups are
+expensive while the historical skylines behind them change at most daily.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pickle
+import time
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from algorithm.right_based.metadata import ResourcePool, RightBasedMetadata
+from common import instrumentation
+from common.blocking import run_blocking, sqlite_transaction
+from common.data_types import TaskInstance, UniqueTask
+from common.time_interval import Hours, Minutes, TimeInterval
+
+__all__ = ["MetadataCache", "CapacityCache", "cached_resource_pool"]
+
+# A task's metadata, or None when the pool has none for it, and the time
+# (as given by the cache's clock) it expires at
+_Entry = Tuple[Optional[RightBasedMetadata], float]
+_Lookup = Dict[UniqueTask, Optional[RightBasedMetadata]]
+
+
+class MetadataCache:
+    """
+    Caches a pool's get_metadata per UniqueTask for `ttl`, keeping at most
+    `max_entries` in memory and evicting the least recently used ones.
+    Tasks the pool has no metadata for are cached too, for the shorter
+    `negative_ttl`, so that they aren't looked up again on every run but
+    are planned soon once their historical skyline appears.
+
+    Concurrent calls share lookups: a task that is already being looked up
+    waits for that lookup instead of starting its own.
+
+    With a `path`, entries are also written to a SQLite file and read back
+    from it on a memory miss, so the cache survives a restart. Tasks
+    without metadata are only cached in memory.
+    """
+
+    def __init__(
+        self,
+        get_metadata: Callable[
+            [FrozenSet[TaskInstance]], Awaitable[Dict[UniqueTask, RightBasedMetadata]]
+        ],
+        ttl: TimeInterval = Hours(12),
+        max_entries: int = 1_000_000,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+        negative_ttl: TimeInterval = Minutes(5),
+    ) -> None:
+        self._get_metadata = get_metadata
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # Wall clock time by default, expiry times are persisted
+        self._clock = clock
+        self._entries: OrderedDict[UniqueTask, _Entry] = OrderedDict()
+        self._in_flight: Dict[UniqueTask, asyncio.Future[_Lookup]] = {}
+        self._disk: Optional[_DiskTier] = _DiskTier(path) if path is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_metadata(
+        self, tasks: FrozenSet[TaskInstance],
+    ) -> Dict[UniqueTask, RightBasedMetadata]:
+        now = self._clock()
+        found: _Lookup = {}
+        missing: Dict[UniqueTask, List[TaskInstance]] = {}
+        # The results keep the order of `tasks`, like the pool's would
+        order: List[UniqueTask] = []
+        for task in tasks:
+            unique_task = task.unique_task
+            if unique_task in found:
+                continue
+            if unique_task in missing:
+                missing[unique_task].append(task)
+                continue
+            order.append(unique_task)
+            entry = self._entries.get(unique_task)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(unique_task)
+                found[unique_task] = entry[0]
+            else:
+                missing.setdefault(unique_task, []).append(task)
+        instrumentation.increment("metadata_cache.hits", len(found))
+
+        if missing and self._disk is not None:
+            loaded = await run_blocking(self._disk.load, list(missing), now)
+            instrumentation.increment("metadata_cache.disk_hits", len(loaded))
+            for unique_task, entry in loaded.items():
+                self._store(unique_task, entry)
+                found[unique_task] = entry[0]
+                del missing[unique_task]
+
+        # Join the lookups already running for some of the tasks, and start
+        # one for the others
+        lookups: Set[asyncio.Future[_Lookup]] = set()
+        to_fetch = {}
+        for unique_task, instances in missing.items():
+            in_flight = self._in_flight.get(unique_task)
+            if in_flight is not None:
+                lookups.add(in_flight)
+            else:
+                to_fetch[unique_task] = instances
+        instrumentation.increment("metadata_cache.coalesced", len(missing) - len(to_fetch))
+        instrumentation.increment("metadata_cache.misses", len(to_fetch))
+        if to_fetch:
+            lookup = asyncio.ensure_future(self._fetch(to_fetch))
+            for unique_task in to_fetch:
+                self._in_flight[unique_task] = lookup
+            lookups.add(lookup)
+        for lookup in lookups:
+            # A cancelled caller mustn't cancel a lookup others wait for
+            result = await asyncio.shield(lookup)
+            for unique_task in missing.keys() & result.keys():
+                found[unique_task] = result[unique_task]
+
+        return {
+            unique_task: found[unique_task]
+            for unique_task in order
+            if found[unique_task] is not None
+        }
+
+    async def _fetch(self, tasks: Dict[UniqueTask, List[TaskInstance]]) -> _Lookup:
+        try:
+            metadata = await self._get_metadata(
+                frozenset(instance for instances in tasks.values() for instance in instances)
+            )
+            now = self._clock()
+            expires_at = now + self.ttl.seconds
+            negative_expires_at = now + self.negative_ttl.seconds
+            result: _Lookup = {unique_task: metadata.get(unique_task) for unique_task in tasks}
+            found = {}
+            for unique_task, meta in result.items():
+                if meta is None:
+                    self._store(unique_task, (None, negative_expires_at))
+                else:
+                    found[unique_task] = (meta, expires_at)
+                    self._store(unique_task, found[unique_task])
+            if self._disk is not None and found:
+                await run_blocking(self._disk.save, found, self._clock())
+            return result
+        finally:
+            for unique_task in tasks:
+                self._in_flight.pop(unique_task, None)
+
+    def _store(self, unique_task: UniqueTask, entry: _Entry) -> None:
+        self._entries[unique_task] = entry
+        self._entries.move_to_end(unique_task)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CapacityCache:
+    """
+    Caches a pool's get_capacity for `ttl`, concurrent calls share a lookup
+    """
+
+    def __init__(
+        self,
+        get_capacity: Callable[[], Awaitable[float]],
+        ttl: TimeInterval = Minutes(5),
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._get_capacity = get_capacity
+        self.ttl = ttl
+        self._clock = clock
+        self._capacity: Optional[Tuple[float, float]] = None
+        self._in_flight: Optional[asyncio.Future[float]] = None
+
+    async def get_capacity(self) -> float:
+        if self._capacity is not None and self._capacity[1] > self._clock():
+            instrumentation.increment("capacity_cache.hits")
+            return self._capacity[0]
+        if self._in_flight is None:
+            instrumentation.increment("capacity_cache.misses")
+            self._in_flight = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self._in_flight)
+
+    async def _fetch(self) -> float:
+        try:
+            capacity = await self._get_capacity()
+            self._capacity = (capacity, self._clock() + self.ttl.seconds)
+            return capacity
+        finally:
+            self._in_flight = None
+
+
+def cached_resource_pool(
+    pool: ResourcePool,
+    ttl: TimeInterval = Hours(12),
+    capacity_ttl: TimeInterval = Minutes(5),
+    max_entries: int = 1_000_000,
+    path: Optional[str] = None,
+    negative_ttl: TimeInterval = Minutes(5),
+) -> ResourcePool:
+    """
+    `pool` with both of its getters cached, see MetadataCache
+    """
+    return ResourcePool(
+        pool.name,
+        MetadataCache(
+            pool.get_metadata, ttl, max_entries, path, negative_ttl=negative_ttl
+        ).get_metadata,
+        CapacityCache(pool.get_capacity, capacity_ttl).get_capacity,
+    )
+
+
+class _DiskTier:
+    """
+    The cache entries in a SQLite table, keyed by task_id and offset
+    """
+
+    # Stay well below SQLite's limit on the number of query parameters
+    _BATCH_SIZE = 400
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with sqlite_transaction(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "task_id TEXT NOT NULL, "
+                "offset INTEGER NOT NULL, "
+                "metadata BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "PRIMARY KEY (task_id, offset))"
+            )
+
+    def load(self, tasks: List[UniqueTask], now: float) -> Dict[UniqueTask, _Entry]:
+        by_key = {(task.task_id, task.offset.seconds): task for task in tasks}
+        keys = list(by_key)
+        entries = {}
+        with sqlite_transaction(self.path) as connection:
+            for i in range(0, len(keys), self._BATCH_SIZE):
+                batch = keys[i:i + self._BATCH_SIZE]
+                rows = connection.execute(
+                    "SELECT task_id, offset, metadata, expires_at FROM metadata "
+                    "WHERE expires_at > ? AND (task_id, offset) IN (VALUES "
+                    + ", ".join(["(?, ?)"] * len(batch)) + ")",
+                    [now] + [value for key in batch for value in key],
+                ).fetchall()
+                for task_id, offset, blob, expires_at in rows:
+                    metadata = pickle.loads(blob)
+                    # Older files also hold the tasks without metadata
+                    if metadata is not None:
+                        entries[by_key[(task_id, offset)]] = (metadata, expires_at)
+        return entries
+
+    def save(self, entries: Dict[UniqueTask, _Entry], now: float) -> None:
+        with sqlite_transaction(self.path) as connection:
+            connection.execute("DELETE FROM metadata WHERE expires_at <= ?", (now,))
+            connection.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                (
+                    (task.task_id, task.offset.seconds, pickle.dumps(metadata), expires_at)
+                    for task, (metadata, expires_at) in entries.items()
+                ),
+            )
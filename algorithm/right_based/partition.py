@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Tuple
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import UniqueTask
+from common.time_interval import TimeInterval
+
+__all__ = ["partition_metadata", "chunk_components", "reachable_bins"]
+
+
+Metadata = Dict[UniqueTask, RightBasedMetadata]
+
+
+def reachable_bins(meta: RightBasedMetadata, granularity: TimeInterval) -> Tuple[int, int]:
+    """
+    The first and last bin a task can occupy anywhere in its start window
+    """
+    g = granularity.seconds
+    duration = sum(block.duration.seconds for block in meta.skyline)
+    first_bin = meta.min_start_time.seconds // g
+    return first_bin, max(first_bin, (meta.max_start_time.seconds + duration - 1) // g)
+
+
+def partition_metadata(metadata: Metadata, granularity: TimeInterval) -> List[Metadata]:
+    """
+    Splits a pool into connected components of tasks whose reachable bins
+    overlap. A task can only touch the bins from the one its min_start_time
+    falls in to the last one its skyline covers when started at
+    max_start_time, so tasks in different components never compete for
+    the same bin and each component can be scheduled on its own skyline
+    with exactly the same result.
+
+    Every component keeps the relative order of `metadata`, which keeps
+    tie-breaking in schedule_tasks identical as well.
+    """
+    spans = sorted(
+        (*reachable_bins(meta, granularity), position)
+        for position, meta in enumerate(metadata.values())
+    )
+
+    component_of = [0] * len(spans)
+    num_components = 0
+    component_end = -1
+    for first_bin, last_bin, position in spans:
+        if first_bin > component_end:
+            num_components += 1
+        component_end = max(component_end, last_bin)
+        component_of[position] = num_components - 1
+
+    components: List[Metadata] = [{} for _ in range(num_components)]
+    for position, (task, meta) in enumerate(metadata.items()):
+        components[component_of[position]][task] = meta
+    return components
+
+
+def chunk_components(components: List[Metadata], num_chunks: int) -> List[Metadata]:
+    """
+    Packs components into at most `num_chunks` chunks of similar task
+    counts, so that many small components don't each pay for a round trip
+    to a worker. Components of a chunk don't overlap either, so a chunk can
+    be scheduled on a single skyline.
+    """
+    num_chunks = max(1, min(num_chunks, len(components)))
+    chunks: List[Metadata] = [{} for _ in range(num_chunks)]
+    heap = [(0, i) for i in range(num_chunks)]
+    for component in sorted(components, key=len, reverse=True):
+        size, i = heapq.heappop(heap)
+        chunks[i].update(component)
+        heapq.heappush(heap, (size + len(component), i))
+    return [chunk for chunk in chunks if chunk]
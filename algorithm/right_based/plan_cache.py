@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import UniqueTask
+from common.memory import MB, Memory
+from common.time_interval import Seconds, TimeInterval
+
+__all__ = ["PlanCache", "fingerprint"]
+
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_SUFFIX = ".plan"
+# Bumped whenever the fingerprint or the stored format changes, so that
+# stale entries are never read back
+_FORMAT_VERSION = b"2"
+
+
+def fingerprint(
+    metadata: Dict[UniqueTask, RightBasedMetadata],
+    granularity: TimeInterval,
+    max_size: float,
+    engine: str,
+    horizon: Optional[TimeInterval] = None,
+) -> str:
+    """
+    A digest of everything schedule_tasks' result depends on. The order of
+    `metadata` is part of it, because it breaks ties between tasks with
+    identical windows. So are the skyline engine and its `horizon`, if it
+    has one: jobs reaching past the horizon are never placed.
+    """
+    digest = hashlib.sha256(_FORMAT_VERSION)
+    horizon_seconds = horizon.seconds if horizon is not None else None
+    digest.update(f"{granularity.seconds}|{max_size!r}|{engine}|{horizon_seconds}\n".encode())
+    skylines: Dict[int, str] = {}
+    for task, meta in metadata.items():
+        # Pools share a handful of skyline lists between many tasks
+        skyline = skylines.get(id(meta.skyline))
+        if skyline is None:
+            skyline = skylines[id(meta.skyline)] = ",".join(
+                f"{block.duration.seconds}:{block.size!r}" for block in meta.skyline
+            )
+        digest.update(
+            f"{task.task_id}|{task.offset.seconds}|{meta.min_start_time.seconds}|"
+            f"{meta.max_start_time.seconds}|{skyline}\n".encode()
+        )
+    return digest.hexdigest()
+
+
+class PlanCache:
+    """
+    Stores the plans of right-based pools on local disk, one file per
+    fingerprint, so that planning an unchanged pool again is a file read.
+
+    The cache holds at most `max_entries` plans and `max_bytes` of them;
+    the least recently used plans (by file modification time, which is
+    refreshed on every hit) are evicted first. Entries are unpickled, so
+    `directory` must only be writable by the planner.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int = 64,
+        max_bytes: Memory = MB(512),
+    ) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[UniqueTask, TimeInterval]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                rows: List[Tuple[str, int, int]] = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Dropping unreadable plan cache entry %s: %s", path, e)
+            self._remove(path)
+            return None
+        return {
+            UniqueTask(task_id, Seconds(offset)): Seconds(start)
+            for task_id, offset, start in rows
+        }
+
+    def put(self, key: str, plan: Dict[UniqueTask, TimeInterval]) -> None:
+        rows = [
+            (task.task_id, task.offset.seconds, start_time.seconds)
+            for task, start_time in plan.items()
+        ]
+        # Written aside and renamed, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[1], reverse=True)
+        total_bytes = 0
+        for i, (path, _, size) in enumerate(entries):
+            total_bytes += size
+            if i >= self.max_entries or total_bytes > self.max_bytes.B:
+                logger.debug("Evicting plan cache entry %s", path)
+                self._remove(path)
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
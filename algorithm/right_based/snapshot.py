@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+A binary snapshot of a right-based pool's metadata, read back through mmap
+so that loading costs the same for any pool size.
+
+Layout (little endian), after a header of the magic bytes and the number
+of tasks n, blocks m and task id bytes k as uint64, every section starting
+at a multiple of 8 bytes:
+
+    min_start        int64[n]     seconds
+    max_start        int64[n]     seconds
+    task_offsets     int64[n]     UniqueTask.offset in seconds
+    block_offsets    int64[n + 1] task i's blocks are [block_offsets[i], block_offsets[i + 1])
+    block_durations  int64[m]     seconds
+    block_sizes      float64[m]
+    id_offsets       int64[n + 1] task i's id is id_bytes[id_offsets[i]:id_offsets[i + 1]]
+    id_bytes         uint8[k]     UTF-8
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tempfile
+from typing import BinaryIO, Dict, Iterator, List, Sequence, Union, overload
+
+import numpy as np
+
+from algorithm.right_based.columnar import ColumnarMetadata
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import UniqueTask
+from common.time_interval import Seconds
+
+__all__ = ["write_snapshot", "read_snapshot", "SnapshotFormatError"]
+
+
+_MAGIC = b"CWRBSN01"
+_HEADER = struct.Struct("<8sQQQ")
+_INT = np.dtype("<i8")
+_FLOAT = np.dtype("<f8")
+
+
+class SnapshotFormatError(Exception):
+    pass
+
+
+def write_snapshot(
+    path: str,
+    metadata: Union[Dict[UniqueTask, RightBasedMetadata], ColumnarMetadata],
+) -> None:
+    """
+    Writes the snapshot next to `path` and renames it into place, so
+    readers never see a partial file
+    """
+    if isinstance(metadata, dict):
+        metadata = ColumnarMetadata.from_metadata(metadata)
+    task_ids = [task.task_id.encode() for task in metadata.tasks]
+    id_offsets = np.zeros(len(task_ids) + 1, dtype=_INT)
+    np.cumsum([len(task_id) for task_id in task_ids], out=id_offsets[1:])
+    sections = [
+        metadata.min_start.astype(_INT),
+        metadata.max_start.astype(_INT),
+        np.fromiter(
+            (task.offset.seconds for task in metadata.tasks), _INT, len(metadata)
+        ),
+        metadata.block_offsets.astype(_INT),
+        metadata.block_durations.astype(_INT),
+        metadata.block_sizes.astype(_FLOAT),
+        id_offsets,
+    ]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(
+                _MAGIC, len(metadata), len(metadata.block_durations), int(id_offsets[-1])
+            ))
+            for section in sections:
+                f.write(section.tobytes())
+            for task_id in task_ids:
+                f.write(task_id)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path: str) -> ColumnarMetadata:
+    """
+    Maps the snapshot read-only and returns metadata whose arrays are views
+    of the mapping. Tasks are only built from their ids when accessed.
+    """
+    with open(path, "rb") as f:
+        buffer = _map(f)
+    if len(buffer) < _HEADER.size:
+        raise SnapshotFormatError(f"{path} is too short to be a snapshot")
+    magic, n, m, k = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise SnapshotFormatError(f"{path} is not a metadata snapshot")
+
+    position = _HEADER.size
+    sections = []
+    for dtype, count in [
+        (_INT, n), (_INT, n), (_INT, n), (_INT, n + 1),
+        (_INT, m), (_FLOAT, m), (_INT, n + 1),
+    ]:
+        if position + count * dtype.itemsize > len(buffer):
+            raise SnapshotFormatError(f"{path} is truncated")
+        sections.append(np.frombuffer(buffer, dtype, count, position))
+        position += count * dtype.itemsize
+    if position + k != len(buffer):
+        raise SnapshotFormatError(f"{path} has the wrong size")
+    min_start, max_start, task_offsets, block_offsets, durations, sizes, id_offsets = sections
+
+    return ColumnarMetadata(
+        tasks=SnapshotTasks(memoryview(buffer)[position:], id_offsets, task_offsets),
+        min_start=min_start,
+        max_start=max_start,
+        block_offsets=block_offsets,
+        block_durations=durations,
+        block_sizes=sizes,
+    )
+
+
+class SnapshotTasks(Sequence[UniqueTask]):
+    """
+    The tasks of a snapshot, decoded from the mapped ids on access
+    """
+
+    def __init__(
+        self, id_bytes: memoryview, id_offsets: np.ndarray, task_offsets: np.ndarray
+    ) -> None:
+        self._id_bytes = id_bytes
+        self._id_offsets = id_offsets
+        self._task_offsets = task_offsets
+
+    def __len__(self) -> int:
+        return len(self._task_offsets)
+
+    def __iter__(self) -> Iterator[UniqueTask]:
+        id_bytes = self._id_bytes
+        id_offsets = self._id_offsets.tolist()
+        offsets: Dict[int, Seconds] = {}
+        for i, offset in enumerate(self._task_offsets.tolist()):
+            interval = offsets.get(offset)
+            if interval is None:
+                interval = offsets[offset] = Seconds(offset)
+            yield UniqueTask(str(id_bytes[id_offsets[i]:id_offsets[i + 1]], "utf-8"), interval)
+
+    @overload
+    def __getitem__(self, i: int) -> UniqueTask: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[UniqueTask]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[UniqueTask, List[UniqueTask]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        first, last = int(self._id_offsets[i]), int(self._id_offsets[i + 1])
+        return UniqueTask(
+            str(self._id_bytes[first:last], "utf-8"), Seconds(int(self._task_offsets[i]))
+        )
+
+
+def _map(f: BinaryIO) -> Union[mmap.mmap, bytes]:
+    # Empty files can't be mapped
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -6,13 +6,41 @@
 
 from __future__ import annotations
 
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
 from abc import ABC
-from typing import FrozenSet
+from array import array
+from itertools import accumulate, islice
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
+from common.blocking import run_blocking
 from common.data_types import TaskInstance
 from common.timestamp import Timestamp
 
 
+__ALL__ = [
+    "TaskFetcher",
+    "HardCodedTaskFetcher",
+    "FileTaskFetcher",
+    "write_task_dump",
+]
+
+
 class TaskFetcher(ABC):
     """
     Your __init__ function must have a signature matching
@@ -39,6 +67,18 @@ class TaskFetcher(ABC):
         """
         raise NotImplementedError()
 
+    async def fetch_batches(self) -> AsyncIterator[FrozenSet[TaskInstance]]:
+        """
+        Yields the same task instances as fetch(), in batches, so that the
+        planner can start looking up and scheduling the first tasks while
+        the rest are still being fetched.
+
+        Fetchers that can produce their tasks incrementally (pages of a
+        query, chunks of a file, ...) should override this. By default the
+        result of fetch() is yielded as a single batch.
+        """
+        yield await self.fetch()
+
 
 class HardCodedTaskFetcher(TaskFetcher):
 
@@ -51,3 +91,280 @@ class HardCodedTaskFetcher(TaskFetcher):
             TaskInstance('task5', Timestamp(10)),
             TaskInstance('task6', Timestamp(10)),
         ])
+
+
+class FileTaskFetcher(TaskFetcher):
+    """
+    Reads task instances from a local dump, in one of three formats:
+
+    jsonl   one {"task_id": ..., "period_id": <unixtime>} object per line
+    csv     a task_id,period_id header, then one instance per row
+    binary  see write_task_dump(), the most compact and fastest to load
+
+    The format is picked from the extension (.jsonl, .csv, .bin) unless
+    given. The file is parsed `chunk_size` instances at a time, off the
+    event loop, and fetch_batches() yields every chunk as soon as it's
+    parsed, so large dumps are never held in memory twice.
+
+    With `reuse_unchanged`, the instances are kept after a fetch and
+    returned again for as long as the file's inode, size and modification
+    time stay the same, which makes repeated fetches by a long-running
+    planner free. This holds the whole dump in memory between fetches, and
+    a file rewritten in place at the same size within the filesystem's
+    mtime resolution goes unnoticed; write_task_dump() replaces the file
+    and is always noticed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        chunk_size: int = 65536,
+        reuse_unchanged: bool = False,
+    ) -> None:
+        self.path = path
+        self.format: str = _dump_format(path, format)
+        self.chunk_size = chunk_size
+        self.reuse_unchanged = reuse_unchanged
+        # The (inode, mtime, size) of the file and its batches, from the
+        # last fetch
+        self._last_fetch: Optional[
+            Tuple[Tuple[int, int, int], List[FrozenSet[TaskInstance]]]
+        ] = None
+
+    async def fetch(self) -> FrozenSet[TaskInstance]:
+        tasks = set()
+        async for batch in self.fetch_batches():
+            tasks.update(batch)
+        return frozenset(tasks)
+
+    async def fetch_batches(self) -> AsyncIterator[FrozenSet[TaskInstance]]:
+        builder = _TaskInstanceBuilder()
+        f = await run_blocking(open, self.path, "rb")
+        with f:
+            stat = os.fstat(f.fileno())
+            version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._last_fetch is not None and self._last_fetch[0] == version:
+                for batch in self._last_fetch[1]:
+                    yield batch
+                return
+            self._last_fetch = None
+            batches = []
+            chunks = _READERS[self.format](f, self.chunk_size)
+            while True:
+                batch = await run_blocking(_next_batch, chunks, builder)
+                if batch is None:
+                    break
+                if self.reuse_unchanged:
+                    batches.append(batch)
+                yield batch
+        if self.reuse_unchanged:
+            self._last_fetch = (version, batches)
+
+
+def write_task_dump(
+    path: str,
+    tasks: Iterable[TaskInstance],
+    format: Optional[str] = None,
+    chunk_size: int = 65536,
+) -> None:
+    """
+    Writes tasks in a format FileTaskFetcher reads, picked from the
+    extension unless given. Writes next to `path` and renames the file
+    into place, so readers never see a partial dump.
+
+    The binary layout is the magic bytes followed by chunks, each a header
+    of the number of instances n and of id bytes k as uint32, then (little
+    endian)
+
+        period_ids  int64[n]   unixtime
+        id_lengths  uint32[n]  bytes of each task id
+        id_bytes    uint8[k]   UTF-8
+    """
+    format = _dump_format(path, format)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            tasks = iter(tasks)
+            if format == "binary":
+                f.write(_MAGIC)
+                while True:
+                    chunk = list(islice(tasks, chunk_size))
+                    if not chunk:
+                        break
+                    _write_binary_chunk(f, chunk)
+            else:
+                with io.TextIOWrapper(f, encoding="utf-8", newline="") as text:
+                    if format == "csv":
+                        writer = csv.writer(text)
+                        writer.writerow(["task_id", "period_id"])
+                        writer.writerows(
+                            (task.task_id, task.period_id.unixtime) for task in tasks
+                        )
+                    else:
+                        text.writelines(
+                            json.dumps({
+                                "task_id": task.task_id,
+                                "period_id": task.period_id.unixtime,
+                            }) + "\n"
+                            for task in tasks
+                        )
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# The task_ids and period_ids (unixtime) of a chunk of instances
+_Chunk = Tuple[List[str], List[int]]
+
+_MAGIC = b"CWTASK01"
+_CHUNK_HEADER = struct.Struct("<II")
+
+
+class _TaskInstanceBuilder:
+    """
+    Builds the instances of a dump, sharing one interned task_id and one
+    Timestamp between all the instances that have them in common
+    """
+
+    def __init__(self) -> None:
+        self._task_ids: Dict[str, str] = {}
+        self._timestamps: Dict[int, Timestamp] = {}
+
+    def build(self, chunk: _Chunk) -> FrozenSet[TaskInstance]:
+        return frozenset(TaskInstance.build_many(self._instances(chunk)))
+
+    def _instances(self, chunk: _Chunk) -> Iterator[Tuple[str, Timestamp]]:
+        task_ids = self._task_ids
+        timestamps = self._timestamps
+        for task_id, period_id in zip(*chunk):
+            interned = task_ids.get(task_id)
+            if interned is None:
+                interned = task_ids[task_id] = sys.intern(task_id)
+            timestamp = timestamps.get(period_id)
+            if timestamp is None:
+                timestamp = timestamps[period_id] = Timestamp(period_id)
+            yield interned, timestamp
+
+
+def _next_batch(
+    chunks: Iterator[_Chunk], builder: _TaskInstanceBuilder,
+) -> Optional[FrozenSet[TaskInstance]]:
+    chunk = next(chunks, None)
+    return builder.build(chunk) if chunk is not None else None
+
+
+def _dump_format(path: str, format: Optional[str]) -> str:
+    if format is None:
+        format = _FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1])
+    if format not in _READERS:
+        raise ValueError(f"Unknown task dump format for {path}: {format}")
+    return format
+
+
+def _read_jsonl(f: BinaryIO, chunk_size: int) -> Iterator[_Chunk]:
+    while True:
+        lines = list(islice(f, chunk_size))
+        if not lines:
+            return
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            continue
+        # A single decode of the whole chunk is several times faster than
+        # one per line
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+        yield (
+            [record["task_id"] for record in records],
+            [int(record["period_id"]) for record in records],
+        )
+
+
+def _read_csv(f: BinaryIO, chunk_size: int) -> Iterator[_Chunk]:
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    try:
+        task_id_column = header.index("task_id")
+        period_id_column = header.index("period_id")
+    except ValueError:
+        raise ValueError(f"CSV task dump needs task_id and period_id columns, got {header}")
+    while True:
+        rows = [row for row in islice(reader, chunk_size) if row]
+        if not rows:
+            return
+        yield (
+            [row[task_id_column] for row in rows],
+            [int(row[period_id_column]) for row in rows],
+        )
+
+
+def _read_binary(f: BinaryIO, chunk_size: int) -> Iterator[_Chunk]:
+    # Chunks are yielded as they were written, chunk_size only applies to
+    # the other formats
+    if f.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError(f"{f.name} is not a binary task dump")
+    while True:
+        header = f.read(_CHUNK_HEADER.size)
+        if not header:
+            return
+        if len(header) != _CHUNK_HEADER.size:
+            raise ValueError(f"{f.name} is truncated")
+        n, k = _CHUNK_HEADER.unpack(header)
+        period_ids = _read_array(f, "q", n)
+        id_lengths = _read_array(f, "I", n)
+        id_bytes = f.read(k)
+        if len(id_bytes) != k or sum(id_lengths) != k:
+            raise ValueError(f"{f.name} is truncated")
+        ends = list(accumulate(id_lengths))
+        starts = [0] + ends[:-1]
+        if id_bytes.isascii():
+            # Byte offsets are character offsets, decode everything at once
+            ids = id_bytes.decode("ascii")
+            task_ids = [ids[start:end] for start, end in zip(starts, ends)]
+        else:
+            task_ids = [
+                str(id_bytes[start:end], "utf-8") for start, end in zip(starts, ends)
+            ]
+        yield task_ids, period_ids.tolist()
+
+
+def _write_binary_chunk(f: BinaryIO, tasks: List[TaskInstance]) -> None:
+    task_ids = [task.task_id.encode() for task in tasks]
+    period_ids = array("q", (task.period_id.unixtime for task in tasks))
+    id_lengths = array("I", (len(task_id) for task_id in task_ids))
+    if sys.byteorder == "big":
+        period_ids.byteswap()
+        id_lengths.byteswap()
+    id_bytes = b"".join(task_ids)
+    f.write(_CHUNK_HEADER.pack(len(tasks), len(id_bytes)))
+    f.write(period_ids.tobytes())
+    f.write(id_lengths.tobytes())
+    f.write(id_bytes)
+
+
+def _read_array(f: BinaryIO, typecode: str, count: int) -> array:
+    values = array(typecode)
+    data = f.read(count * values.itemsize)
+    if len(data) != count * values.itemsize:
+        raise ValueError(f"{f.name} is truncated")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+_READERS = {
+    "jsonl": _read_jsonl,
+    "csv": _read_csv,
+    "binary": _read_binary,
+}
+
+_FORMATS_BY_EXTENSION = {
+    ".jsonl": "jsonl",
+    ".csv": "csv",
+    ".bin": "binary",
+}
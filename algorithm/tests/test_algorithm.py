@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from typing import Dict, FrozenSet
+
+from algorithm.algorithm import RightBased
+from algorithm.right_based.metadata import ResourcePool, RightBasedMetadata
+from algorithm.right_based.plan_cache import PlanCache
+from common.data_types import TaskInstance, UniqueTask
+from common.pipeline import iterate
+from common.instrumentation import RecordingSink, use_sink
+from common.skyline_math import SkylineBlock
+from common.time_interval import Days, Seconds
+from common.timestamp import Timestamp
+
+
+def make_pool(name: str, task_ids: Dict[str, int], capacity: float) -> ResourcePool:
+    """
+    A pool where each task wants to start at the given second, in a
+    window of 10s, and fills a capacity of 1 for 5s
+    """
+    async def get_metadata(
+        tasks: FrozenSet[TaskInstance],
+    ) -> Dict[UniqueTask, RightBasedMetadata]:
+        requested = {task.task_id for task in tasks}
+        return {
+            UniqueTask(task_id, Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(start - 10),
+                max_start_time=Seconds(start),
+                skyline=[SkylineBlock(Seconds(5), 1.0)],
+            )
+            for task_id, start in task_ids.items()
+            if task_id in requested
+        }
+
+    async def get_capacity() -> float:
+        return capacity
+
+    return ResourcePool(name, get_metadata, get_capacity)
+
+
+class TestRightBased(unittest.TestCase):
+
+    def run_pools(self, max_workers: int) -> Dict[TaskInstance, Timestamp]:
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[
+                make_pool("a", {"a1": 20, "a2": 20, "shared": 30}, capacity=1),
+                make_pool("b", {"b1": 20, "b2": 20, "shared": 40}, capacity=2),
+            ],
+            max_workers=max_workers,
+        )
+        tasks = frozenset(
+            TaskInstance(task_id, Timestamp(0))
+            for task_id in ["a1", "a2", "b1", "b2", "shared", "unknown"]
+        )
+        try:
+            return asyncio.run(algorithm.run(tasks))
+        finally:
+            algorithm.close()
+
+    def test_pools_are_independent(self) -> None:
+        plan = {
+            task.task_id: time.unixtime
+            for task, time in self.run_pools(max_workers=0).items()
+        }
+        # Pool a fits a single task at a time, pool b fits both at once
+        self.assertEqual(sorted([plan["a1"], plan["a2"]]), [15, 20])
+        self.assertEqual([plan["b1"], plan["b2"]], [20, 20])
+        # The first pool's assignment wins
+        self.assertEqual(plan["shared"], 30)
+        self.assertNotIn("unknown", plan)
+
+    def test_worker_processes(self) -> None:
+        self.assertEqual(self.run_pools(max_workers=2), self.run_pools(max_workers=0))
+
+    def test_incremental_runs_keep_the_previous_plan(self) -> None:
+        task_ids = {"a1": 20, "a2": 20}
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[make_pool("a", task_ids, capacity=1)],
+            max_workers=0,
+            incremental=True,
+        )
+        tasks = frozenset(TaskInstance(task_id, Timestamp(0)) for task_id in task_ids)
+        try:
+            first = asyncio.run(algorithm.run(tasks))
+            task_ids["a3"] = 30
+            second = asyncio.run(algorithm.run(tasks | {TaskInstance("a3", Timestamp(0))}))
+        finally:
+            algorithm.close()
+        self.assertEqual({task: second[task] for task in first}, first)
+        self.assertEqual(second[TaskInstance("a3", Timestamp(0))].unixtime, 30)
+
+    # Task pools sharing the algorithm keep their own skylines, neither
+    # takes the other's tasks off
+    def test_incremental_state_per_task_pool(self) -> None:
+        task_ids = {"a1": 20, "a2": 20, "b1": 30}
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[make_pool("a", task_ids, capacity=1)],
+            max_workers=0,
+            incremental=True,
+        )
+        task_pools = {
+            "x": frozenset([TaskInstance("a1", Timestamp(0)), TaskInstance("a2", Timestamp(0))]),
+            "y": frozenset([TaskInstance("b1", Timestamp(0))]),
+        }
+        sink = RecordingSink()
+        try:
+            with use_sink(sink):
+                for _ in range(2):
+                    for name, tasks in task_pools.items():
+                        asyncio.run(algorithm.run_batches(iterate([tasks]), name))
+        finally:
+            algorithm.close()
+        self.assertEqual(sink.counters.get("reschedule_tasks.tasks_removed", 0), 0)
+
+    # With workers, incremental runs are rescheduled in a thread and their
+    # measurements still reach the planner's sink
+    def test_incremental_runs_off_the_event_loop(self) -> None:
+        task_ids = {"a1": 20, "a2": 20}
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[make_pool("a", task_ids, capacity=1)],
+            max_workers=1,
+            incremental=True,
+            coarse_granularity=Seconds(5),
+        )
+        a1, a2 = (TaskInstance(task_id, Timestamp(0)) for task_id in task_ids)
+        sink = RecordingSink()
+        try:
+            first = asyncio.run(algorithm.run(frozenset([a1, a2])))
+            with use_sink(sink):
+                second = asyncio.run(algorithm.run(frozenset([a1])))
+        finally:
+            algorithm.close()
+        self.assertEqual(second, {a1: first[a1]})
+        self.assertEqual(sink.counters["reschedule_tasks.tasks_removed"], 1)
+
+    def test_plan_cache_hit(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            algorithm = RightBased(
+                granularity=Seconds(1),
+                resource_pools=[make_pool("a", {"a1": 20, "a2": 20}, capacity=1)],
+                max_workers=0,
+                plan_cache=PlanCache(directory),
+            )
+            tasks = frozenset(TaskInstance(task_id, Timestamp(0)) for task_id in ["a1", "a2"])
+            sink = RecordingSink()
+            with use_sink(sink):
+                plans = [asyncio.run(algorithm.run(tasks)) for _ in range(2)]
+        self.assertEqual(plans[0], plans[1])
+        self.assertEqual(sink.counters["right_based.plan_cache.misses"], 1)
+        self.assertEqual(sink.counters["right_based.plan_cache.hits"], 1)
+
+    # The array engine can't place a2 past its horizon, it mustn't get the
+    # dict engine's plan from a shared cache
+    def test_plan_cache_per_engine(self) -> None:
+        task_ids = {"a1": 20, "a2": Days(3).seconds}
+        tasks = frozenset(TaskInstance(task_id, Timestamp(0)) for task_id in task_ids)
+        plans = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for engine in ("dict", "array"):
+                algorithm = RightBased(
+                    skyline_engine=engine,
+                    granularity=Seconds(1),
+                    resource_pools=[make_pool("a", task_ids, capacity=1)],
+                    max_workers=0,
+                    plan_cache=PlanCache(directory),
+                )
+                plans[engine] = asyncio.run(algorithm.run(tasks))
+        self.assertIn(TaskInstance("a2", Timestamp(0)), plans["dict"])
+        self.assertNotIn(TaskInstance("a2", Timestamp(0)), plans["array"])
+
+    def test_time_budget_carries_over(self) -> None:
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[make_pool("a", {"a1": 20, "a2": 20}, capacity=1)],
+            max_workers=0,
+            time_budget=Seconds(0),
+        )
+        tasks = frozenset(TaskInstance(task_id, Timestamp(0)) for task_id in ["a1", "a2"])
+        try:
+            self.assertEqual(asyncio.run(algorithm.run(tasks)), {})
+            algorithm.time_budget = None
+            plan = asyncio.run(algorithm.run(tasks))
+        finally:
+            algorithm.close()
+        self.assertEqual(sorted(time.unixtime for time in plan.values()), [15, 20])
+
+    def test_batches(self) -> None:
+        algorithm = RightBased(
+            granularity=Seconds(1),
+            resource_pools=[make_pool("a", {"a1": 20, "a2": 20, "a3": 30}, capacity=1)],
+            max_workers=0,
+        )
+        batches = [
+            frozenset([TaskInstance("a1", Timestamp(0))]),
+            frozenset([TaskInstance("a2", Timestamp(0)), TaskInstance("a3", Timestamp(0))]),
+        ]
+        try:
+            plan = asyncio.run(algorithm.run_batches(iterate(batches)))
+            self.assertEqual(plan, asyncio.run(algorithm.run(batches[0] | batches[1])))
+        finally:
+            algorithm.close()
+        self.assertEqual(
+            {task.task_id: time.unixtime for task, time in plan.items()},
+            {"a1": 20, "a2": 15, "a3": 30},
+        )
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import unittest
+
+from algorithm.right_based.algorithm import schedule_tasks
+from algorithm.right_based.columnar import ColumnarMetadata
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import UniqueTask
+from common.skyline_math import SkylineBlock
+from common.time_interval import Seconds
+
+
+class TestColumnarMetadata(unittest.TestCase):
+
+    def setUp(self) -> None:
+        short = [SkylineBlock(Seconds(2), 1.0)]
+        long = [SkylineBlock(Seconds(3), 0.5), SkylineBlock(Seconds(2), 1.0)]
+        self.metadata = {
+            UniqueTask(f"task_{i}", Seconds(i)): RightBasedMetadata(
+                min_start_time=Seconds(i % 4),
+                max_start_time=Seconds(i % 4 + 6),
+                skyline=short if i % 3 else long,
+            )
+            for i in range(12)
+        }
+
+    def test_round_trip(self) -> None:
+        columnar = ColumnarMetadata.from_metadata(self.metadata)
+        self.assertEqual(len(columnar), 12)
+        self.assertEqual(columnar.block_offsets.tolist()[:4], [0, 2, 3, 4])
+        self.assertEqual(columnar.to_metadata(), self.metadata)
+        shape_ids, shapes = columnar.shapes()
+        self.assertEqual(len(shapes), 2)
+        self.assertEqual(shape_ids[:4], [0, 1, 1, 0])
+
+    # Latest windows first, equal windows in their original order, like
+    # sorting the dict
+    def test_placement_order(self) -> None:
+        columnar = ColumnarMetadata.from_metadata(self.metadata)
+        tasks = list(self.metadata)
+        self.assertEqual(
+            [tasks[i] for i in columnar.placement_order()],
+            [task for task, _ in sorted(
+                self.metadata.items(), key=lambda x: x[1], reverse=True
+            )],
+        )
+
+    def test_schedule_tasks(self) -> None:
+        columnar = ColumnarMetadata.from_metadata(self.metadata)
+        for engine in ("dict", "steps"):
+            self.assertEqual(
+                schedule_tasks(columnar, Seconds(1), max_size=2, engine=engine),
+                schedule_tasks(self.metadata, Seconds(1), max_size=2, engine=engine),
+            )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import Dict, FrozenSet, List
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from algorithm.right_based.metadata_cache import CapacityCache, MetadataCache
+from common.data_types import TaskInstance, UniqueTask
+from common.skyline_math import SkylineBlock
+from common.time_interval import Seconds
+from common.timestamp import Timestamp
+
+
+class FakePool:
+    """
+    Knows every task but "unknown", and records what it's asked for
+    """
+
+    def __init__(self) -> None:
+        self.requests: List[List[str]] = []
+        self.capacity_requests = 0
+
+    async def get_metadata(
+        self, tasks: FrozenSet[TaskInstance],
+    ) -> Dict[UniqueTask, RightBasedMetadata]:
+        self.requests.append(sorted(task.task_id for task in tasks))
+        await asyncio.sleep(0.01)
+        return {
+            task.unique_task: RightBasedMetadata(
+                min_start_time=Seconds(0),
+                max_start_time=Seconds(10),
+                skyline=[SkylineBlock(Seconds(5), 1.0)],
+            )
+            for task in tasks
+            if task.task_id != "unknown"
+        }
+
+    async def get_capacity(self) -> float:
+        self.capacity_requests += 1
+        await asyncio.sleep(0.01)
+        return 2.0
+
+
+def tasks(*task_ids: str) -> FrozenSet[TaskInstance]:
+    return frozenset(TaskInstance(task_id, Timestamp(0)) for task_id in task_ids)
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pool = FakePool()
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_hits_and_expiry(self) -> None:
+        cache = MetadataCache(self.pool.get_metadata, ttl=Seconds(60), clock=self.clock)
+        first = asyncio.run(cache.get_metadata(tasks("a", "unknown")))
+        self.assertEqual(list(first), [UniqueTask("a", Seconds(0))])
+        # Tasks without metadata are cached too
+        self.assertEqual(asyncio.run(cache.get_metadata(tasks("a", "unknown", "b"))).keys(), {
+            UniqueTask("a", Seconds(0)), UniqueTask("b", Seconds(0)),
+        })
+        self.assertEqual(self.pool.requests, [["a", "unknown"], ["b"]])
+        self.now = 61
+        asyncio.run(cache.get_metadata(tasks("a")))
+        self.assertEqual(self.pool.requests[-1], ["a"])
+
+    def test_negative_entries_expire_sooner(self) -> None:
+        cache = MetadataCache(
+            self.pool.get_metadata, ttl=Seconds(600), negative_ttl=Seconds(60), clock=self.clock
+        )
+        asyncio.run(cache.get_metadata(tasks("a", "unknown")))
+        self.now = 61
+        asyncio.run(cache.get_metadata(tasks("a", "unknown")))
+        self.assertEqual(self.pool.requests, [["a", "unknown"], ["unknown"]])
+
+    def test_lru_eviction(self) -> None:
+        cache = MetadataCache(self.pool.get_metadata, max_entries=2, clock=self.clock)
+        asyncio.run(cache.get_metadata(tasks("a", "b")))
+        asyncio.run(cache.get_metadata(tasks("a")))
+        asyncio.run(cache.get_metadata(tasks("c")))
+        self.assertEqual(len(cache), 2)
+        asyncio.run(cache.get_metadata(tasks("a", "b")))
+        self.assertEqual(self.pool.requests[-1], ["b"])
+
+    def test_concurrent_calls_share_lookups(self) -> None:
+        cache = MetadataCache(self.pool.get_metadata, clock=self.clock)
+
+        async def run() -> List[Dict[UniqueTask, RightBasedMetadata]]:
+            return await asyncio.gather(
+                cache.get_metadata(tasks("a", "b")),
+                cache.get_metadata(tasks("b", "c")),
+            )
+
+        first, second = asyncio.run(run())
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(self.pool.requests, [["a", "b"], ["c"]])
+
+    def test_persistence(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            cache = MetadataCache(self.pool.get_metadata, path=path, clock=self.clock)
+            expected = asyncio.run(cache.get_metadata(tasks("a", "unknown")))
+            restarted = MetadataCache(self.pool.get_metadata, path=path, clock=self.clock)
+            self.assertEqual(asyncio.run(restarted.get_metadata(tasks("a", "unknown"))), expected)
+            # Tasks without metadata aren't persisted
+            self.assertEqual(self.pool.requests, [["a", "unknown"], ["unknown"]])
+
+    def test_capacity(self) -> None:
+        cache = CapacityCache(self.pool.get_capacity, ttl=Seconds(60), clock=self.clock)
+
+        async def run() -> List[float]:
+            return await asyncio.gather(cache.get_capacity(), cache.get_capacity())
+
+        self.assertEqual(asyncio.run(run()), [2.0, 2.0])
+        self.assertEqual(asyncio.run(cache.get_capacity()), 2.0)
+        self.assertEqual(self.pool.capacity_requests, 1)
+        self.now = 61
+        asyncio.run(cache.get_capacity())
+        self.assertEqual(self.pool.capacity_requests, 2)
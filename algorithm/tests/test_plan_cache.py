@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from algorithm.right_based.plan_cache import PlanCache, fingerprint
+from common.data_types import UniqueTask
+from common.memory import B
+from common.skyline_math import SkylineBlock
+from common.time_interval import Days, Seconds
+
+
+def make_metadata(max_start: int = 10) -> RightBasedMetadata:
+    return RightBasedMetadata(
+        min_start_time=Seconds(0),
+        max_start_time=Seconds(max_start),
+        skyline=[SkylineBlock(Seconds(5), 1.5)],
+    )
+
+
+class TestPlanCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_fingerprint(self) -> None:
+        task_a, task_b = UniqueTask("a", Seconds(0)), UniqueTask("b", Seconds(0))
+        pool = {task_a: make_metadata(), task_b: make_metadata()}
+        key = fingerprint(pool, Seconds(60), 3, "dict")
+        self.assertEqual(key, fingerprint(dict(pool), Seconds(60), 3, "dict"))
+        self.assertNotEqual(key, fingerprint(pool, Seconds(1), 3, "dict"))
+        self.assertNotEqual(key, fingerprint(pool, Seconds(60), 4, "dict"))
+        self.assertNotEqual(
+            key, fingerprint({**pool, task_b: make_metadata(11)}, Seconds(60), 3, "dict")
+        )
+        # The order breaks ties in schedule_tasks
+        self.assertNotEqual(
+            key, fingerprint({task_b: pool[task_b], task_a: pool[task_a]}, Seconds(60), 3, "dict")
+        )
+
+    # The array engine can't place jobs past its horizon, so its plans
+    # differ from the other engines' for pools that reach beyond it
+    def test_fingerprint_engine(self) -> None:
+        pool = {UniqueTask("a", Seconds(0)): make_metadata()}
+        key = fingerprint(pool, Seconds(60), 3, "dict")
+        self.assertEqual(key, fingerprint(pool, Seconds(60), 3, "dict"))
+        array_key = fingerprint(pool, Seconds(60), 3, "array", Days(2))
+        self.assertNotEqual(key, array_key)
+        self.assertNotEqual(key, fingerprint(pool, Seconds(60), 3, "steps"))
+        self.assertNotEqual(array_key, fingerprint(pool, Seconds(60), 3, "array", Days(1)))
+
+    def test_round_trip(self) -> None:
+        cache = PlanCache(self.directory.name)
+        plan = {UniqueTask("a", Seconds(30)): Seconds(10)}
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", plan)
+        self.assertEqual(PlanCache(self.directory.name).get("key"), plan)
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        cache = PlanCache(self.directory.name, max_entries=2)
+        plan = {UniqueTask("a", Seconds(0)): Seconds(10)}
+        cache.put("first", plan)
+        cache.put("second", plan)
+        os.utime(cache._path("first"), (0, 0))
+        os.utime(cache._path("second"), (1, 1))
+        cache.get("first")
+        cache.put("third", plan)
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(cache.get("first"), plan)
+        self.assertEqual(cache.get("third"), plan)
+
+        # A single entry over the size bound isn't kept either
+        PlanCache(self.directory.name, max_bytes=B(1)).put("fourth", plan)
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -7,11 +7,20 @@
 
 from __future__ import annotations
 
+import time
 import unittest
 
-from algorithm.right_based.algorithm import schedule_tasks
+from algorithm.right_based.algorithm import (
+    ScheduleState,
+    reschedule_tasks,
+    schedule_tasks,
+    schedule_tasks_until,
+)
 from algorithm.right_based.metadata import RightBasedMetadata
+from algorithm.right_based.partition import chunk_components, partition_metadata
 from common.data_types import UniqueTask
+from common.instrumentation import RecordingSink, use_sink
+from common.skyline_hierarchy import CoarseToFineSkylineTracker
 from common.skyline_math import SkylineBlock
 from common.time_interval import Seconds
 
@@ -228,3 +237,194 @@ class Infeasible(unittest.TestCase):
                 },
             ],
         )
+
+class ArrayEngine(unittest.TestCase):
+
+    def test_array_engine_matches_default(self) -> None:
+        skyline = [SkylineBlock(Seconds(1), 1)]
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(i % 3),
+                max_start_time=Seconds(5 + i % 4),
+                skyline=skyline,
+            )
+            for i in range(8)
+        }
+        self.assertEqual(
+            schedule_tasks(pool, granularity=Seconds(1), max_size=1, engine="array"),
+            schedule_tasks(pool, granularity=Seconds(1), max_size=1),
+        )
+
+
+class Partition(unittest.TestCase):
+
+    def test_components_schedule_like_the_whole_pool(self) -> None:
+        skyline = [SkylineBlock(Seconds(3), 1)]
+        # Windows [0, 2], [1, 4] and [30, 31], [40, 42]: the first two can
+        # share bins, the others can't reach anything
+        windows = [(0, 2), (1, 4), (30, 31), (40, 42), (1, 3)]
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(lo),
+                max_start_time=Seconds(hi),
+                skyline=skyline,
+            )
+            for i, (lo, hi) in enumerate(windows)
+        }
+        components = partition_metadata(pool, Seconds(1))
+        self.assertEqual(
+            [sorted(task.task_id for task in component) for component in components],
+            [["task_0", "task_1", "task_4"], ["task_2"], ["task_3"]],
+        )
+
+        expected = schedule_tasks(pool, granularity=Seconds(1), max_size=2)
+        for chunks in (components, chunk_components(components, 2)):
+            plan = {}
+            for chunk in chunks:
+                plan.update(schedule_tasks(chunk, granularity=Seconds(1), max_size=2))
+            self.assertEqual(plan, expected)
+        self.assertEqual(len(chunk_components(components, 2)), 2)
+
+
+class Reschedule(unittest.TestCase):
+
+    def test_only_churn_is_replaced(self) -> None:
+        skyline = [SkylineBlock(Seconds(2), 1)]
+
+        def meta(lo: int, hi: int) -> RightBasedMetadata:
+            return RightBasedMetadata(
+                min_start_time=Seconds(lo), max_start_time=Seconds(hi), skyline=skyline
+            )
+
+        task_a, task_b, task_c, task_d = (
+            UniqueTask(task_id, Seconds(0)) for task_id in ["a", "b", "c", "d"]
+        )
+        pool = {task_a: meta(0, 10), task_b: meta(0, 10), task_c: meta(8, 8)}
+        state = reschedule_tasks(pool, None, granularity=Seconds(1), max_size=1)
+        self.assertEqual(state.assignments, schedule_tasks(pool, Seconds(1), max_size=1))
+        self.assertEqual(
+            state.assignments,
+            {task_a: Seconds(10), task_b: Seconds(6), task_c: Seconds(8)},
+        )
+
+        # b leaves, d arrives: a and c stay put and d takes b's place
+        pool = {task_a: meta(0, 10), task_c: meta(8, 8), task_d: meta(0, 7)}
+        state = reschedule_tasks(pool, state, granularity=Seconds(1), max_size=1)
+        self.assertEqual(
+            state.assignments,
+            {task_a: Seconds(10), task_c: Seconds(8), task_d: Seconds(6)},
+        )
+
+        # c's window moves, which frees the bins it held
+        pool[task_c] = meta(0, 2)
+        state = reschedule_tasks(pool, state, granularity=Seconds(1), max_size=1)
+        self.assertEqual(
+            state.assignments,
+            {task_a: Seconds(10), task_c: Seconds(2), task_d: Seconds(6)},
+        )
+        rebuilt = ScheduleState.from_assignments(
+            pool, state.assignments, Seconds(1), max_size=1
+        )
+        self.assertEqual(
+            {t: size for t, size in state.skyline.time_series.items() if size},
+            rebuilt.skyline.time_series,
+        )
+
+
+    def test_coarse_granularity(self) -> None:
+        skyline = [SkylineBlock(Seconds(2), 1)]
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(0), max_start_time=Seconds(20 + i), skyline=skyline
+            )
+            for i in range(8)
+        }
+        state = reschedule_tasks(
+            pool, None, granularity=Seconds(1), max_size=1, coarse_granularity=Seconds(5)
+        )
+        self.assertEqual(state.coarse_granularity, Seconds(5))
+        self.assertIsInstance(state.skyline, CoarseToFineSkylineTracker)
+        self.assertEqual(state.assignments, schedule_tasks(pool, Seconds(1), max_size=1))
+        task = UniqueTask("late", Seconds(0))
+        pool[task] = RightBasedMetadata(
+            min_start_time=Seconds(0), max_start_time=Seconds(40), skyline=skyline
+        )
+        state = reschedule_tasks(
+            pool, state, granularity=Seconds(1), max_size=1, coarse_granularity=Seconds(5)
+        )
+        self.assertEqual(state.assignments[task], Seconds(40))
+        self.assertEqual(state.assignments, schedule_tasks(pool, Seconds(1), max_size=1))
+
+
+class CoarseToFine(unittest.TestCase):
+
+    def test_coarse_to_fine_matches_fine(self) -> None:
+        skyline = [SkylineBlock(Seconds(70), 1), SkylineBlock(Seconds(20), 2)]
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(i * 7 % 50),
+                max_start_time=Seconds(i * 7 % 50 + 200),
+                skyline=skyline,
+            )
+            for i in range(20)
+        }
+        self.assertEqual(
+            schedule_tasks(
+                pool, granularity=Seconds(1), max_size=3, coarse_granularity=Seconds(60)
+            ),
+            schedule_tasks(pool, granularity=Seconds(1), max_size=3),
+        )
+
+
+class Grouping(unittest.TestCase):
+
+    # Identical tasks resume where the previous one landed and are rejected
+    # without probing once one of them doesn't fit
+    def test_identical_tasks(self) -> None:
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(6),
+                max_start_time=Seconds(10),
+                skyline=[SkylineBlock(Seconds(2), 1)],
+            )
+            for i in range(7)
+        }
+        sink = RecordingSink()
+        with use_sink(sink):
+            res = schedule_tasks(pool, granularity=Seconds(1), max_size=2)
+        self.assertEqual(
+            sorted(start.seconds for start in res.values()), [6, 6, 8, 8, 10, 10]
+        )
+        self.assertEqual(sink.counters["schedule_tasks.task_groups"], 1)
+        # 1 probe per accepted task, 2 more when 10 and then 8 fill up, and
+        # the 7th task only probes 6
+        self.assertEqual(sink.counters["schedule_tasks.skyline_probes"], 9)
+
+
+class Deadline(unittest.TestCase):
+
+    def test_resume_after_deadline(self) -> None:
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(i),
+                max_start_time=Seconds(i + 5),
+                skyline=[SkylineBlock(Seconds(3), 1)],
+            )
+            for i in range(6)
+        }
+        plan, pending = schedule_tasks_until(
+            pool, granularity=Seconds(1), max_size=1, deadline=time.monotonic() - 1
+        )
+        self.assertEqual(plan, {})
+        # Latest windows first
+        self.assertEqual(
+            [task.task_id for task in pending],
+            [f"task_{i}" for i in reversed(range(6))],
+        )
+
+        state = ScheduleState.from_assignments(
+            pool, plan, Seconds(1), max_size=1, pending=pending
+        )
+        state = reschedule_tasks(pool, state, granularity=Seconds(1), max_size=1)
+        self.assertEqual(state.pending, set())
+        self.assertEqual(state.assignments, schedule_tasks(pool, Seconds(1), max_size=1))
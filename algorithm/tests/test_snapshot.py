@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+from algorithm.right_based.algorithm import schedule_tasks
+from algorithm.right_based.metadata import RightBasedMetadata
+from algorithm.right_based.snapshot import (
+    SnapshotFormatError,
+    read_snapshot,
+    write_snapshot,
+)
+from common.data_types import UniqueTask
+from common.skyline_math import SkylineBlock
+from common.time_interval import Seconds
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "pool.snapshot")
+        self.metadata = {
+            UniqueTask(f"tâche_{i}", Seconds(i * 60)): RightBasedMetadata(
+                min_start_time=Seconds(i),
+                max_start_time=Seconds(i + 10),
+                skyline=[SkylineBlock(Seconds(3), 1.5)] * (1 + i % 2),
+            )
+            for i in range(5)
+        }
+
+    def test_round_trip(self) -> None:
+        write_snapshot(self.path, self.metadata)
+        snapshot = read_snapshot(self.path)
+        self.assertEqual(snapshot.to_metadata(), self.metadata)
+        self.assertEqual(snapshot.tasks[-1], UniqueTask("tâche_4", Seconds(240)))
+        self.assertEqual(
+            schedule_tasks(snapshot, Seconds(1), max_size=2),
+            schedule_tasks(self.metadata, Seconds(1), max_size=2),
+        )
+
+    def test_empty_pool(self) -> None:
+        write_snapshot(self.path, {})
+        self.assertEqual(len(read_snapshot(self.path)), 0)
+
+    def test_invalid_files(self) -> None:
+        write_snapshot(self.path, self.metadata)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for invalid in [b"", b"NOTASNAP" + data[8:], data[:-1]]:
+            with open(self.path, "wb") as f:
+                f.write(invalid)
+            with self.assertRaises(SnapshotFormatError):
+                read_snapshot(self.path)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import FrozenSet, List
+
+from algorithm.task_fetchers import FileTaskFetcher, write_task_dump
+from common.data_types import TaskInstance
+from common.timestamp import Timestamp
+from planner.config import get_task_fetcher
+
+
+async def collect(fetcher: FileTaskFetcher) -> List[FrozenSet[TaskInstance]]:
+    return [batch async for batch in fetcher.fetch_batches()]
+
+
+class TestFileTaskFetcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.tasks = [
+            TaskInstance(f"task_{i % 7}", Timestamp(i * 60)) for i in range(20)
+        ] + [TaskInstance("tâche", Timestamp(0))]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_round_trip(self) -> None:
+        for name in ["dump.jsonl", "dump.csv", "dump.bin"]:
+            write_task_dump(self.path(name), self.tasks, chunk_size=8)
+            fetcher = get_task_fetcher("file", self.path(name), chunk_size=8)
+            self.assertEqual(asyncio.run(fetcher.fetch()), frozenset(self.tasks), name)
+            batches = asyncio.run(collect(fetcher))
+            self.assertEqual([len(batch) for batch in batches], [8, 8, 5], name)
+
+    def test_instances_share_ids_and_timestamps(self) -> None:
+        write_task_dump(self.path("dump.bin"), self.tasks)
+        tasks = asyncio.run(FileTaskFetcher(self.path("dump.bin")).fetch())
+        task_0 = [task for task in tasks if task.task_id == "task_0"]
+        self.assertIs(task_0[0].task_id, task_0[1].task_id)
+        at_zero = [task for task in tasks if task.period_id.unixtime == 0]
+        self.assertIs(at_zero[0].period_id, at_zero[1].period_id)
+
+    def test_csv_columns_in_any_order(self) -> None:
+        with open(self.path("dump.csv"), "w") as f:
+            f.write("period_id,owner,task_id\n60,me,task_a\n\n120,me,task_b\n")
+        self.assertEqual(
+            asyncio.run(FileTaskFetcher(self.path("dump.csv")).fetch()),
+            frozenset([TaskInstance("task_a", Timestamp(60)), TaskInstance("task_b", Timestamp(120))]),
+        )
+
+    def test_invalid_dumps(self) -> None:
+        with self.assertRaises(ValueError):
+            FileTaskFetcher(self.path("dump.txt"))
+        write_task_dump(self.path("dump.bin"), self.tasks)
+        with open(self.path("dump.bin"), "r+b") as f:
+            f.truncate(os.path.getsize(self.path("dump.bin")) - 1)
+        with self.assertRaises(ValueError):
+            asyncio.run(FileTaskFetcher(self.path("dump.bin")).fetch())
+        with open(self.path("dump.csv"), "w") as f:
+            f.write("id,period\n")
+        with self.assertRaises(ValueError):
+            asyncio.run(FileTaskFetcher(self.path("dump.csv")).fetch())
+
+    def test_parses_off_the_event_loop(self) -> None:
+        write_task_dump(self.path("dump.jsonl"), self.tasks)
+        fetcher = FileTaskFetcher(self.path("dump.jsonl"), chunk_size=8)
+
+        async def fetch_while_ticking() -> List[int]:
+            ticks = 0
+
+            async def tick() -> None:
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            ticker = asyncio.ensure_future(tick())
+            await asyncio.sleep(0)
+            seen = [ticks async for _ in fetcher.fetch_batches()]
+            ticker.cancel()
+            return seen
+
+        # Other tasks run while every chunk is parsed
+        seen = asyncio.run(fetch_while_ticking())
+        self.assertEqual(len(seen), 3)
+        self.assertLess(seen[0], seen[1])
+        self.assertLess(seen[1], seen[2])
+
+    def test_reuse_unchanged(self) -> None:
+        write_task_dump(self.path("dump.csv"), self.tasks)
+        fetcher = FileTaskFetcher(self.path("dump.csv"), reuse_unchanged=True)
+        first = asyncio.run(collect(fetcher))
+        self.assertIs(asyncio.run(collect(fetcher))[0], first[0])
+        # Off by default, nothing is kept between fetches
+        fetcher = FileTaskFetcher(self.path("dump.csv"))
+        self.assertIsNot(asyncio.run(collect(fetcher))[0], asyncio.run(collect(fetcher))[0])
+        write_task_dump(self.path("dump.csv"), self.tasks[:3])
+        self.assertEqual(asyncio.run(fetcher.fetch()), frozenset(self.tasks[:3]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Times how long the planner's entry points take to import, each in fresh
+interpreters, and writes the results to a JSON file, so that runs on
+different commits can be compared.
+
+Run it from the repository root, for example
+
+> python3 -m benchmark.bench_import --output before.json
+> python3 -m benchmark.bench_import --baseline before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmark.bench_scheduler import _git_commit
+
+
+Result = Dict[str, Any]
+
+# What each scenario runs, after the interpreter started
+SCENARIOS: Dict[str, str] = {
+    "planner.config": "import planner.config",
+    "main.py imports": "import planner.config, planner.plan_writer, planner.planner",
+    "right_based": "from planner.config import get_algorithm; get_algorithm('right_based')",
+    "hard_coded": "from planner.config import get_task_fetcher; get_task_fetcher('hard_coded')",
+}
+
+_TIMED = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS),
+    )
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="fresh interpreters per scenario, the median is kept")
+    parser.add_argument("--output", default="bench_import.json")
+    parser.add_argument("--baseline", default=None,
+                        help="a previous output file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for scenario in args.scenarios:
+        result = _run(scenario, args.repeat)
+        print(_format(result))
+        results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            _compare(json.load(f)["results"], results)
+    return 0
+
+
+def _run(scenario: str, repeat: int) -> Result:
+    import_times = []
+    process_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.check_output(
+            [sys.executable, "-c", _TIMED.format(statement=SCENARIOS[scenario])], text=True
+        )
+        process_times.append(time.perf_counter() - start)
+        import_times.append(float(output.split()[-1]))
+    return {
+        "scenario": scenario,
+        "repeat": repeat,
+        "import_s": statistics.median(import_times),
+        "process_s": statistics.median(process_times),
+    }
+
+
+def _format(result: Result) -> str:
+    return (
+        f"{result['scenario']:>16} | import {result['import_s'] * 1000:8.1f}ms | "
+        f"process {result['process_s'] * 1000:8.1f}ms"
+    )
+
+
+def _compare(baseline: List[Result], results: List[Result]) -> None:
+    previous = {result["scenario"]: result for result in baseline}
+    for result in results:
+        before: Optional[Result] = previous.get(result["scenario"])
+        if before is None:
+            continue
+        speedup = before["import_s"] / result["import_s"] if result["import_s"] else float("inf")
+        print(
+            f"{_format(result)} | import was {before['import_s'] * 1000:8.1f}ms ({speedup:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Times the right-based scheduler on seeded synthetic pools and writes the
+results to a JSON file, so that runs on different commits can be compared.
+
+Run it from the repository root, for example
+
+> python3 -m benchmark.bench_scheduler --sizes 1000 10000 --output before.json
+> python3 -m benchmark.bench_scheduler --sizes 1000 10000 --baseline before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from algorithm.algorithm import RightBased
+from algorithm.right_based import algorithm as rb_algo
+from algorithm.right_based.metadata import ResourcePool, RightBasedMetadata
+from benchmark.workload import WorkloadConfig, generate_task_instances
+from common.data_types import UniqueTask
+from common.time_interval import Seconds
+
+
+Result = Dict[str, Any]
+ResultKey = Tuple[str, int, int, str]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+        help="number of tasks in each generated pool",
+    )
+    parser.add_argument(
+        "--granularities", type=int, nargs="+", default=[60, 1],
+        help="scheduling granularities to run, in seconds",
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=["dict"],
+        help="skyline engines to run, see common.skyline_math.get_skyline_tracker",
+    )
+    parser.add_argument(
+        "--coarse-granularity", type=int, default=None,
+        help="coarse granularity to search start times at first, in seconds",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="worker processes for RightBased.run, 0 schedules in-process",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--capacity", type=float, default=None,
+                        help="pool capacity, defaults to scaling with the pool size")
+    parser.add_argument("--max-window", type=int, default=WorkloadConfig.max_window_s,
+                        help="widest start window, in seconds")
+    parser.add_argument("--num-shapes", type=int, default=WorkloadConfig.num_shapes,
+                        help="number of distinct skyline shapes in a pool")
+    parser.add_argument(
+        "--benchmarks", nargs="+", default=["schedule_tasks", "right_based_run"],
+        choices=["schedule_tasks", "schedule_tasks_columnar", "right_based_run"],
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None,
+                        help="a previous output file to compare against")
+    args = parser.parse_args()
+
+    # The scheduler's progress logging would dominate small runs
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for num_tasks in args.sizes:
+        config = WorkloadConfig(
+            num_tasks=num_tasks,
+            seed=args.seed,
+            capacity=args.capacity if args.capacity is not None else max(10.0, num_tasks / 50),
+            max_window_s=args.max_window,
+            num_shapes=args.num_shapes,
+        )
+        tasks, metadata = generate_task_instances(config)
+        for granularity in args.granularities:
+            for engine in args.engines:
+                for benchmark in args.benchmarks:
+                    result = _run(
+                        benchmark, config, tasks, metadata, granularity, engine,
+                        args.repeat, args.workers, args.coarse_granularity,
+                    )
+                    print(_format(result))
+                    results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            _compare(json.load(f)["results"], results)
+    return 0
+
+
+def _run(
+    benchmark: str,
+    config: WorkloadConfig,
+    tasks: Any,
+    metadata: Dict[UniqueTask, RightBasedMetadata],
+    granularity: int,
+    engine: str,
+    repeat: int,
+    workers: int,
+    coarse_granularity: Optional[int],
+) -> Result:
+    coarse = Seconds(coarse_granularity) if coarse_granularity is not None else None
+    columnar = None
+    if benchmark == "schedule_tasks_columnar":
+        # NumPy is only needed for this benchmark. The pool is converted up
+        # front, as a fetcher producing columns would.
+        from algorithm.right_based.columnar import ColumnarMetadata
+
+        columnar = ColumnarMetadata.from_metadata(metadata)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if benchmark in ("schedule_tasks", "schedule_tasks_columnar"):
+            accepted = len(rb_algo.schedule_tasks(
+                columnar if columnar is not None else metadata,
+                granularity=Seconds(granularity),
+                max_size=config.capacity, engine=engine, coarse_granularity=coarse,
+            ))
+        else:
+            algorithm = RightBased(
+                skyline_engine=engine,
+                granularity=Seconds(granularity),
+                resource_pools=[_synthetic_pool(metadata, config.capacity)],
+                max_workers=workers,
+                coarse_granularity=coarse,
+            )
+            try:
+                accepted = len(asyncio.run(algorithm.run(tasks)))
+            finally:
+                algorithm.close()
+        timings.append(time.perf_counter() - start)
+    return {
+        "benchmark": benchmark,
+        "num_tasks": config.num_tasks,
+        "granularity_s": granularity,
+        "engine": engine,
+        "workers": workers if benchmark == "right_based_run" else None,
+        "coarse_granularity_s": coarse_granularity,
+        "capacity": config.capacity,
+        "seed": config.seed,
+        "accepted": accepted,
+        "seconds": min(timings),
+        "all_seconds": timings,
+    }
+
+
+def _synthetic_pool(
+    metadata: Dict[UniqueTask, RightBasedMetadata], capacity: float
+) -> ResourcePool:
+    async def get_metadata(tasks: Any) -> Dict[UniqueTask, RightBasedMetadata]:
+        return metadata
+
+    async def get_capacity() -> float:
+        return capacity
+
+    return ResourcePool("synthetic", get_metadata, get_capacity)
+
+
+def _key(result: Result) -> ResultKey:
+    return (
+        result["benchmark"], result["num_tasks"], result["granularity_s"], result["engine"]
+    )
+
+
+def _format(result: Result) -> str:
+    return (
+        f"{result['benchmark']:>16} | tasks {result['num_tasks']:>8} | "
+        f"granularity {result['granularity_s']:>5}s | engine {result['engine']:>6} | "
+        f"{result['seconds']:9.3f}s | accepted {result['accepted']}"
+    )
+
+
+def _compare(baseline: List[Result], results: List[Result]) -> None:
+    previous = {_key(result): result for result in baseline}
+    for result in results:
+        before: Optional[Result] = previous.get(_key(result))
+        if before is None:
+            continue
+        speedup = before["seconds"] / result["seconds"] if result["seconds"] else float("inf")
+        print(
+            f"{_format(result)} | was {before['seconds']:9.3f}s ({speedup:.2f}x)"
+            + ("" if before["accepted"] == result["accepted"] else
+               f" | accepted was {before['accepted']}")
+        )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    exit(main())
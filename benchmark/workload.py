@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple
+
+from algorithm.right_based.metadata import RightBasedMetadata
+from common.data_types import TaskInstance, UniqueTask
+from common.skyline_math import SkylineBlock
+from common.time_interval import Days, Seconds
+from common.timestamp import Timestamp
+
+
+__ALL__ = ["WorkloadConfig", "generate_metadata", "generate_task_instances"]
+
+
+@dataclass
+class WorkloadConfig:
+    """
+    Describes a synthetic right-based task pool. All times are in seconds.
+
+    Every task gets a start window [min_start_time, max_start_time] inside
+    the first `horizon_s` seconds of the day, and one of `num_shapes`
+    distinct skylines, so that shape reuse can be controlled independently
+    of the pool size.
+    """
+
+    num_tasks: int
+    seed: int = 0
+    capacity: float = 100.0
+    horizon_s: int = Days(1).seconds
+    min_window_s: int = 0
+    max_window_s: int = 6 * 3600
+    num_shapes: int = 1000
+    min_blocks: int = 1
+    max_blocks: int = 4
+    min_block_s: int = 60
+    max_block_s: int = 3600
+    min_block_size: float = 0.5
+    max_block_size: float = 8.0
+
+
+def generate_metadata(config: WorkloadConfig) -> Dict[UniqueTask, RightBasedMetadata]:
+    """
+    Generates the same pool for the same config, so that runs on different
+    commits schedule identical inputs
+    """
+    return dict(_generate(config))
+
+
+def generate_task_instances(
+    config: WorkloadConfig,
+) -> Tuple[FrozenSet[TaskInstance], Dict[UniqueTask, RightBasedMetadata]]:
+    """
+    Returns the task instances of the pool along with its metadata. Every
+    instance's period starts at its unique task's offset, so that the two
+    map onto each other through TaskInstance.unique_task.
+    """
+    metadata = dict(_generate(config))
+    tasks = frozenset(
+        TaskInstance(unique_task.task_id, Timestamp(unique_task.offset.seconds))
+        for unique_task in metadata
+    )
+    return tasks, metadata
+
+
+def _generate(config: WorkloadConfig) -> List[Tuple[UniqueTask, RightBasedMetadata]]:
+    rng = random.Random(config.seed)
+    shapes = [_random_shape(rng, config) for _ in range(max(1, config.num_shapes))]
+    pool = []
+    for i in range(config.num_tasks):
+        skyline = rng.choice(shapes)
+        window = rng.randint(config.min_window_s, config.max_window_s)
+        min_start = rng.randint(0, max(0, config.horizon_s - window))
+        pool.append((
+            UniqueTask(f"task_{i}", Seconds(rng.randrange(Days(1).seconds))),
+            RightBasedMetadata(
+                min_start_time=Seconds(min_start),
+                max_start_time=Seconds(min_start + window),
+                skyline=skyline,
+            ),
+        ))
+    return pool
+
+
+def _random_shape(rng: random.Random, config: WorkloadConfig) -> List[SkylineBlock]:
+    return [
+        SkylineBlock(
+            Seconds(rng.randint(config.min_block_s, config.max_block_s)),
+            round(rng.uniform(config.min_block_size, config.max_block_size), 2),
+        )
+        for _ in range(rng.randint(config.min_blocks, config.max_blocks))
+    ]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Helpers for the blocking work (file reads, SQLite queries, ...) that
+coroutines hand off to a thread, so the event loop goes on meanwhile.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sqlite3
+from typing import Any, Callable, Iterator, TypeVar
+
+
+__ALL__ = ["run_blocking", "sqlite_transaction"]
+
+
+T = TypeVar("T")
+
+
+async def run_blocking(function: Callable[..., T], *args: Any) -> T:
+    """
+    function(*args), in the event loop's default executor
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+@contextlib.contextmanager
+def sqlite_transaction(path: str) -> Iterator[sqlite3.Connection]:
+    """
+    A connection to the SQLite file at `path`, where everything done is
+    committed on success and rolled back on error. The connection is
+    closed either way.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
@@ -6,8 +6,10 @@
 
 from __future__ import annotations
 
+import gc
+import sys
 from dataclasses import dataclass
-from typing import Dict, FrozenSet
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from common.timestamp import Timestamp
 from common.time_interval import Days, Seconds
@@ -16,29 +18,91 @@ from common.time_interval import Days, Seconds
 __ALL__ = ["TaskInstance", "UnixtimeAssignments"]
 
 
-@dataclass
+# TaskInstance and UniqueTask are immutable and slotted, and compute their
+# hash once. They are used as dict keys for every task of a pool, often
+# hundreds of thousands of times per planning run, so task_ids are also
+# interned to share one string between every instance of a task.
+
+
+@dataclass(frozen=True, eq=False)
 class TaskInstance:
+    __slots__ = ("task_id", "period_id", "_hash", "_unique_task")
+
     task_id: str
     period_id: Timestamp
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "task_id", sys.intern(self.task_id))
+        object.__setattr__(
+            self, "_hash", hash((self.task_id, self.period_id.unixtime))
+        )
+        object.__setattr__(self, "_unique_task", None)
+
     def __hash__(self) -> int:
-        # Note, the existence of __hash__ implies that TaskInstances
-        # should always be immutable
-        return hash((self.task_id, self.period_id.unixtime))
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TaskInstance):
+            return NotImplemented
+        return self is other or (
+            self._hash == other._hash
+            and self.task_id == other.task_id
+            and self.period_id == other.period_id
+        )
 
-    def __eq__(self, other: TaskInstance) -> bool:
-        return (self.task_id == other.task_id) and (self.period_id == other.period_id)
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (TaskInstance, (self.task_id, self.period_id))
+
+    @classmethod
+    def build_many(
+        cls, instances: Iterable[Tuple[str, Timestamp]]
+    ) -> List[TaskInstance]:
+        """
+        Builds instances from (task_id, period_id) pairs, two to three
+        times faster than calling the constructor for each, for loaders of
+        large task dumps. task_ids must already be interned.
+        """
+        new = object.__new__
+        # The slot descriptors set attributes without going through the
+        # frozen __setattr__
+        set_task_id = cls.task_id.__set__
+        set_period_id = cls.period_id.__set__
+        set_hash = cls._hash.__set__
+        set_unique_task = cls._unique_task.__set__
+        tasks = []
+        # Instances can't form reference cycles, so the cyclic collector
+        # would only rescan the growing list over and over
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for task_id, period_id in instances:
+                task = new(cls)
+                set_task_id(task, task_id)
+                set_period_id(task, period_id)
+                set_hash(task, hash((task_id, period_id.unixtime)))
+                set_unique_task(task, None)
+                tasks.append(task)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return tasks
 
     @property
     def unique_task(self) -> UniqueTask:
-        return UniqueTask(
-            self.task_id,
-            Seconds((self.period_id - self.period_id.midnight).seconds),
-        )
+        unique_task: Optional[UniqueTask] = self._unique_task
+        if unique_task is None:
+            unique_task = UniqueTask(
+                self.task_id,
+                Seconds((self.period_id - self.period_id.midnight).seconds),
+            )
+            object.__setattr__(self, "_unique_task", unique_task)
+        return unique_task
 
 
-@dataclass
+@dataclass(frozen=True, eq=False)
 class UniqueTask:
+    __slots__ = ("task_id", "offset", "_hash")
+
     task_id: str
     offset: Seconds
 
@@ -47,11 +111,23 @@ class UniqueTask:
             raise ValueError(
                 f'A unique task offset: {self.offset.seconds} greater than a day makes no sense.'
             )
+        object.__setattr__(self, "task_id", sys.intern(self.task_id))
+        object.__setattr__(self, "_hash", hash((self.task_id, self.offset.seconds)))
 
     def __hash__(self) -> int:
-        # Note, the existence of __hash__ implies that UniqueTask
-        # should always be immutable
-        return hash((self.task_id, self.offset.seconds))
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, UniqueTask):
+            return NotImplemented
+        return self is other or (
+            self._hash == other._hash
+            and self.task_id == other.task_id
+            and self.offset == other.offset
+        )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (UniqueTask, (self.task_id, self.offset))
 
 
 UnixtimeAssignments = Dict[TaskInstance, Timestamp]
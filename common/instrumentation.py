@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List
+
+
+__ALL__ = [
+    "InstrumentationSink",
+    "RecordingSink",
+    "RunReport",
+    "get_sink",
+    "use_sink",
+    "timer",
+    "increment",
+    "observe",
+]
+
+
+RunReport = Dict[str, Any]
+
+
+class InstrumentationSink:
+    """
+    Receives the phase timings and counters of a planning run. This base
+    class drops everything, so instrumented code costs next to nothing
+    unless a run installs a real sink with use_sink().
+
+    Subclasses can forward measurements anywhere (logs, a metrics service,
+    ...). Hot loops check `enabled` before doing any per-item bookkeeping.
+    """
+
+    enabled: bool = False
+
+    def begin_run(self) -> None:
+        pass
+
+    def end_run(self) -> RunReport:
+        return {}
+
+    def record_time(self, name: str, seconds: float) -> None:
+        pass
+
+    def increment(self, name: str, value: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Records one sample of a distribution, e.g. the probes of one task
+        """
+        pass
+
+    def merge(self, other: RecordingSink) -> None:
+        """
+        Replays everything `other` recorded into this sink, e.g. the
+        measurements made in a worker process
+        """
+        for name, times in other.timers.items():
+            for seconds in times:
+                self.record_time(name, seconds)
+        for name, value in other.counters.items():
+            self.increment(name, value)
+        for name, values in other.samples.items():
+            for sample in values:
+                self.observe(name, sample)
+
+
+class RecordingSink(InstrumentationSink):
+    """
+    Keeps every measurement of a run in memory and summarizes them in the
+    report returned by end_run()
+    """
+
+    enabled: bool = True
+
+    def __init__(self) -> None:
+        self.timers: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.samples: Dict[str, List[float]] = {}
+
+    def begin_run(self) -> None:
+        self.timers, self.counters, self.samples = {}, {}, {}
+
+    def end_run(self) -> RunReport:
+        return {
+            "timers": {
+                name: {
+                    "count": len(times),
+                    "total_s": sum(times),
+                    "max_s": max(times),
+                }
+                for name, times in self.timers.items()
+            },
+            "counters": dict(self.counters),
+            "distributions": {
+                name: {
+                    "count": len(values),
+                    "mean": sum(values) / len(values),
+                    "max": max(values),
+                }
+                for name, values in self.samples.items()
+            },
+        }
+
+    def record_time(self, name: str, seconds: float) -> None:
+        self.timers.setdefault(name, []).append(seconds)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        self.samples.setdefault(name, []).append(value)
+
+
+_NULL_SINK = InstrumentationSink()
+_current_sink: ContextVar[InstrumentationSink] = ContextVar(
+    "instrumentation_sink", default=_NULL_SINK
+)
+
+
+def get_sink() -> InstrumentationSink:
+    return _current_sink.get()
+
+
+@contextlib.contextmanager
+def use_sink(sink: InstrumentationSink) -> Iterator[InstrumentationSink]:
+    """
+    Sends every measurement made in this context (including asyncio tasks
+    started from it) to `sink`
+    """
+    token = _current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _current_sink.reset(token)
+
+
+@contextlib.contextmanager
+def timer(name: str) -> Iterator[None]:
+    sink = _current_sink.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.record_time(name, time.perf_counter() - start)
+
+
+def increment(name: str, value: int = 1) -> None:
+    _current_sink.get().increment(name, value)
+
+
+def observe(name: str, value: float) -> None:
+    _current_sink.get().observe(name, value)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Tuple, TypeVar, Union
+
+
+__ALL__ = ["buffered", "iterate"]
+
+
+T = TypeVar("T")
+
+
+async def buffered(source: AsyncIterable[T], maxsize: int) -> AsyncIterator[T]:
+    """
+    Iterates over `source` in a background task that runs up to `maxsize`
+    items ahead of the consumer, so that producing the next items overlaps
+    with processing the current one. Once the queue is full the producer
+    waits, which bounds the memory held in between.
+
+    Errors raised by `source` are raised to the consumer, and the producer
+    is cancelled when the consumer stops early.
+    """
+    queue: asyncio.Queue[Tuple[bool, Union[T, Optional[Exception]]]] = asyncio.Queue(maxsize)
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put((True, item))
+        except Exception as e:
+            await queue.put((False, e))
+        else:
+            await queue.put((False, None))
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            has_item, item = await queue.get()
+            if not has_item:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        producer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
+
+
+async def iterate(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+
+__ALL__ = ["RangeMaxTree"]
+
+
+class RangeMaxTree:
+    """
+    An iterative segment tree answering range-max queries over the
+    non-negative integer positions [0, inf). Every position starts at 0,
+    only non-negative values may be stored, and the tree doubles its
+    capacity whenever a position past the end is written.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        size = 1
+        while size < capacity:
+            size *= 2
+        self._size = size
+        self._tree: List[float] = [0.0] * (2 * size)
+
+    def __getitem__(self, position: int) -> float:
+        if position >= self._size:
+            return 0.0
+        return self._tree[self._size + position]
+
+    def __setitem__(self, position: int, value: float) -> None:
+        if position >= self._size:
+            self._grow(position + 1)
+        tree = self._tree
+        node = self._size + position
+        tree[node] = value
+        node >>= 1
+        while node:
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if left >= right else right
+            node >>= 1
+
+    def max(self, lo: int, hi: int) -> float:
+        """
+        The largest value in the inclusive range [lo, hi]
+        """
+        result = 0.0
+        for node in self._cover(lo, hi):
+            if self._tree[node] > result:
+                result = self._tree[node]
+        return result
+
+    def first_above(self, lo: int, hi: int, limit: float) -> Optional[int]:
+        """
+        The leftmost position in the inclusive range [lo, hi] whose value is
+        strictly greater than `limit`, or None if there isn't one.
+        """
+        if limit < 0:
+            # Every stored value is expected to be non-negative
+            return lo if lo <= hi else None
+        tree = self._tree
+        for node in self._cover(lo, hi):
+            if tree[node] > limit:
+                while node < self._size:
+                    node *= 2
+                    if tree[node] <= limit:
+                        node += 1
+                return node - self._size
+        return None
+
+    def _cover(self, lo: int, hi: int) -> List[int]:
+        """
+        The canonical nodes covering [lo, hi], ordered left to right
+        """
+        left_nodes, right_nodes = [], []
+        lo = max(lo, 0) + self._size
+        hi = min(hi, self._size - 1) + self._size + 1
+        while lo < hi:
+            if lo & 1:
+                left_nodes.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right_nodes.append(hi)
+            lo >>= 1
+            hi >>= 1
+        return left_nodes + right_nodes[::-1]
+
+    def _grow(self, capacity: int) -> None:
+        size = self._size
+        while size < capacity:
+            size *= 2
+        leaves = self._tree[self._size:]
+        self._size = size
+        self._tree = [0.0] * size + leaves + [0.0] * (size - len(leaves))
+        tree = self._tree
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if left >= right else right
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.skyline_math import (
+    SkylineBlock,
+    SkylineBoundsExceeded,
+    SkylineProfile,
+    SkylineTracker,
+    skyline_profile,
+)
+from common.time_interval import Days, Seconds, TimeInterval
+
+
+__ALL__ = ["ArraySkylineTracker"]
+
+
+class ArraySkylineTracker(SkylineTracker):
+    """
+    A SkylineTracker backed by a dense float array covering a fixed horizon
+    (bin i holds the level of [i * granularity, (i + 1) * granularity)).
+
+    Every probe and update is a vectorized operation over the slice of bins
+    covered by the job, so the cost of an operation does not depend on how
+    many jobs have already been scheduled. Jobs that would extend past the
+    horizon can never be added.
+    """
+
+    default_horizon: TimeInterval = Days(2)
+
+    def __init__(
+        self,
+        granularity: TimeInterval,
+        max_size: float,
+        horizon: Optional[TimeInterval] = None,
+    ) -> None:
+        if horizon is None:
+            horizon = self.default_horizon
+        # The dense array replaces SkylineTracker.time_series entirely, so
+        # the parent __init__ is deliberately not called
+        self._granularity = granularity
+        self._max_size = max_size
+        num_bins = -(-horizon.seconds // granularity.seconds)
+        self._horizon = horizon
+        self._levels: np.ndarray = np.zeros(num_bins, dtype=np.float64)
+
+    @property
+    def horizon(self) -> TimeInterval:
+        return self._horizon
+
+    @property
+    def time_series(self) -> Dict[TimeInterval, float]:
+        g = self._granularity.seconds
+        return {
+            Seconds(int(i) * g): float(self._levels[i])
+            for i in np.flatnonzero(self._levels)
+        }
+
+    def latest_feasible_start(
+        self,
+        blocks: List[SkylineBlock],
+        min_start: TimeInterval,
+        max_start: TimeInterval,
+    ) -> Optional[TimeInterval]:
+        """
+        Evaluates every candidate start time at once: a sparse table over the
+        bins the candidates can reach gives, for each run of equally sized
+        bins in the job's profile, the fullest bin that run would land on at
+        each candidate. The latest candidate where every run fits wins.
+        """
+        if max_start < min_start:
+            return None
+        g = self._granularity.seconds
+        first_bin, profile = skyline_profile(blocks, self._granularity, max_start)
+        dense = _dense_profile(profile)
+        self.probes += 1
+        # Fast path: most jobs fit at their latest start time
+        if self._profile_fits(first_bin, dense, 1.0):
+            return max_start
+
+        max_steps = (max_start.seconds - min_start.seconds) // g
+        lowest_bin = first_bin - max_steps
+        highest_bin = min(first_bin - 1, len(self._levels) - len(dense))
+        if highest_bin < lowest_bin:
+            return None
+        num_candidates = highest_bin - lowest_bin + 1
+        window = self._levels[lowest_bin:highest_bin + len(dense)]
+        self.probes += num_candidates
+        self.bins_touched += len(window)
+
+        runs = [run for run in profile.runs if run[2] > 0]
+        widest = max((last - first + 1 for first, last, _ in runs), default=0)
+        sparse_table = [window]
+        while 2 ** len(sparse_table) <= widest:
+            prev, half = sparse_table[-1], 2 ** (len(sparse_table) - 1)
+            sparse_table.append(np.maximum(prev[:-half], prev[half:]))
+
+        feasible = np.ones(num_candidates, dtype=bool)
+        for first, last, size in runs:
+            width = last - first + 1
+            level = width.bit_length() - 1
+            table = sparse_table[level]
+            fullest = np.maximum(
+                table[first:first + num_candidates],
+                table[last + 1 - 2 ** level:last + 1 - 2 ** level + num_candidates],
+            )
+            feasible &= fullest + size <= self._max_size
+
+        candidates = np.flatnonzero(feasible)
+        if len(candidates) == 0:
+            return None
+        steps = first_bin - (lowest_bin + int(candidates[-1]))
+        return Seconds(max_start.seconds - steps * g)
+
+    def can_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        return self._job_fits(start_time, blocks, 1.0)
+
+    def can_remove(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        return self._job_fits(start_time, blocks, -1.0)
+
+    def try_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        first_bin, profile = self._make_profile(start_time, blocks)
+        if not self._profile_fits(first_bin, profile, 1.0):
+            return False
+        self._levels[first_bin:first_bin + len(profile)] += profile
+        return True
+
+    def add_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        self._apply_job(start_time, blocks, 1.0)
+
+    def remove_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        self._apply_job(start_time, blocks, -1.0)
+
+    def _job_fits(
+        self, start_time: TimeInterval, blocks: List[SkylineBlock], sign: float
+    ) -> bool:
+        first_bin, profile = self._make_profile(start_time, blocks)
+        return self._profile_fits(first_bin, profile, sign)
+
+    def _profile_fits(self, first_bin: int, profile: np.ndarray, sign: float) -> bool:
+        last_bin = first_bin + len(profile)
+        if last_bin > len(self._levels):
+            return False
+        self.bins_touched += len(profile)
+        new_levels = self._levels[first_bin:last_bin] + sign * profile
+        return bool(
+            np.all(new_levels >= 0) and np.all(new_levels <= self._max_size)
+        )
+
+    def _apply_job(
+        self, start_time: TimeInterval, blocks: List[SkylineBlock], sign: float
+    ) -> None:
+        first_bin, profile = self._make_profile(start_time, blocks)
+        if not self._profile_fits(first_bin, profile, sign):
+            raise SkylineBoundsExceeded()
+        self._levels[first_bin:first_bin + len(profile)] += sign * profile
+
+    def _make_profile(
+        self, start_time: TimeInterval, blocks: List[SkylineBlock]
+    ) -> Tuple[int, np.ndarray]:
+        """
+        Returns the first bin touched by the job and the job's size in
+        every bin from there on
+        """
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        return first_bin, _dense_profile(profile)
+
+    def _max_level(self, lo: int, hi: int) -> float:
+        levels = self._levels[max(lo, 0):hi + 1]
+        self.bins_touched += len(levels)
+        return float(levels.max()) if len(levels) else 0.0
+
+
+@lru_cache(maxsize=65536)
+def _dense_profile(profile: SkylineProfile) -> np.ndarray:
+    dense = np.zeros(profile.num_bins, dtype=np.float64)
+    for first, last, size in profile.runs:
+        dense[first:last + 1] = size
+    dense.flags.writeable = False
+    return dense
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from common.skyline_math import (
+    SkylineBlock,
+    SkylineTracker,
+    skyline_profile,
+)
+from common.time_interval import Seconds, TimeInterval
+
+
+__ALL__ = ["CoarseToFineSkylineTracker"]
+
+
+class CoarseToFineSkylineTracker(SkylineTracker):
+    """
+    Wraps a SkylineTracker with a second, coarse skyline that bounds it
+    from above, so that most placements are decided at the coarse
+    granularity and the fine skyline is only searched where needed.
+
+    Each coarse bin holds the highest level of the fine bins inside it, and
+    jobs are checked against it max-binned, with the largest size they have
+    anywhere in a coarse bin. A start time that fits the coarse skyline
+    therefore fits the fine one too. The converse doesn't hold, a coarse
+    rejection proves nothing.
+
+    latest_feasible_start first looks for the latest start time that fits
+    the coarse skyline, then searches the fine skyline only between that
+    start time and max_start. The result is exactly the one of the fine
+    tracker alone, it just needs fewer fine probes whenever the coarse
+    skyline has room.
+    """
+
+    def __init__(self, fine: SkylineTracker, coarse_granularity: TimeInterval) -> None:
+        # Everything is delegated to the two trackers, so the parent
+        # __init__ is deliberately not called
+        if coarse_granularity.seconds % fine.granularity.seconds:
+            raise ValueError(
+                f"Coarse granularity {coarse_granularity} is not a multiple "
+                f"of {fine.granularity}"
+            )
+        self._fine = fine
+        self._coarse = SkylineTracker(coarse_granularity, fine._max_size)
+        self._granularity = fine.granularity
+        self._max_size = fine._max_size
+
+    @property
+    def probes(self) -> int:
+        return self._fine.probes + self._coarse.probes
+
+    @property
+    def bins_touched(self) -> int:
+        return self._fine.bins_touched + self._coarse.bins_touched
+
+    @property
+    def horizon(self) -> Optional[TimeInterval]:
+        return self._fine.horizon
+
+    @property
+    def time_series(self) -> Dict[TimeInterval, float]:
+        return self._fine.time_series
+
+    def latest_feasible_start(
+        self,
+        blocks: List[SkylineBlock],
+        min_start: TimeInterval,
+        max_start: TimeInterval,
+    ) -> Optional[TimeInterval]:
+        max_start = self._latest_start_within_horizon(blocks, max_start)
+        if max_start < min_start:
+            return None
+        # The coarse search steps from max_start by the coarse granularity,
+        # which is a multiple of the fine one, so its answer is one of the
+        # fine candidates
+        coarse_start = self._coarse.latest_feasible_start(blocks, min_start, max_start)
+        if coarse_start is None:
+            return self._fine.latest_feasible_start(blocks, min_start, max_start)
+        if coarse_start < max_start:
+            fine_start = self._fine.latest_feasible_start(
+                blocks, Seconds(coarse_start.seconds + self._granularity.seconds), max_start
+            )
+            if fine_start is not None:
+                return fine_start
+        # The coarse skyline only bounds the fine one where the fine tracker
+        # has bins, so its answer is confirmed before it's trusted
+        if self._fine.can_add(coarse_start, blocks):
+            return coarse_start
+        return self._fine.latest_feasible_start(blocks, min_start, coarse_start)
+
+    def _latest_start_within_horizon(
+        self, blocks: List[SkylineBlock], max_start: TimeInterval
+    ) -> TimeInterval:
+        """
+        The latest of max_start, max_start - granularity, ... at which the
+        job ends within the fine tracker's horizon, if it has one
+        """
+        horizon = self._fine.horizon
+        if horizon is None:
+            return max_start
+        g = self._granularity.seconds
+        num_bins = -(-horizon.seconds // g)
+        first_bin, profile = skyline_profile(blocks, self._granularity, max_start)
+        steps = max(0, first_bin + profile.num_bins - num_bins)
+        return Seconds(max_start.seconds - steps * g)
+
+    def can_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        return self._fine.can_add(start_time, blocks)
+
+    def can_remove(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        return self._fine.can_remove(start_time, blocks)
+
+    def try_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        if not self._fine.try_add(start_time, blocks):
+            return False
+        self._bound(start_time, blocks)
+        return True
+
+    def add_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        self._fine.add_job(start_time, blocks)
+        self._bound(start_time, blocks)
+
+    def remove_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        self._fine.remove_job(start_time, blocks)
+        self._bound(start_time, blocks)
+
+    def _bound(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        """
+        Brings the coarse bins covered by a job that was just added or
+        removed back to the highest level of their fine bins
+        """
+        ratio = self._coarse.granularity.seconds // self._granularity.seconds
+        first_bin, profile = skyline_profile(blocks, self._coarse.granularity, start_time)
+        coarse = self._coarse
+        for c_bin in range(first_bin, first_bin + profile.num_bins):
+            level = self._fine._max_level(c_bin * ratio, c_bin * ratio + ratio - 1)
+            coarse._bins[c_bin] = level
+            coarse._index[c_bin] = level
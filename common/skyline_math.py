@@ -4,13 +4,19 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import operator
 from dataclasses import dataclass
-from typing import Callable, Dict, Generator, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
 
+from common.range_max import RangeMaxTree
 from common.time_interval import Seconds, TimeInterval
 
 
+# Slack used when the range-max index rules out start times, so that float
+# rounding can never make it skip a start time the exact check would accept
+_INDEX_TOLERANCE = 1e-9
+
+
 @dataclass
 class SkylineBlock:
     duration: TimeInterval
@@ -24,6 +30,79 @@ class SkylineBoundsExceeded(Exception):
     pass
 
 
+# A skyline's blocks as (duration in seconds, size) pairs, the part of a
+# skyline that profiles are memoized on
+SkylineShape = Tuple[Tuple[int, float], ...]
+
+
+@dataclass(frozen=True)
+class SkylineProfile:
+    """
+    The footprint of a job on the bins of a skyline, as (first, last, size)
+    runs of consecutive equally sized bins. Bin indices are relative to the
+    bin the job's start time falls in, so moving the job by whole bins only
+    shifts the profile.
+
+    A bin shared by two blocks takes the size of the larger one, and
+    adjacent blocks of equal size are merged into a single run.
+    """
+
+    runs: Tuple[Tuple[int, int, float], ...]
+
+    @property
+    def num_bins(self) -> int:
+        return self.runs[-1][1] + 1 if self.runs else 0
+
+    @property
+    def max_size(self) -> float:
+        return max((size for _, _, size in self.runs), default=0.0)
+
+
+def skyline_shape(blocks: List[SkylineBlock]) -> SkylineShape:
+    return tuple((block.duration.seconds, block.size) for block in blocks)
+
+
+def skyline_profile(
+    blocks: List[SkylineBlock], granularity: TimeInterval, start_time: TimeInterval
+) -> Tuple[int, SkylineProfile]:
+    """
+    Returns the bin index of start_time and the job's profile from there.
+
+    The profile only depends on the skyline's shape, the granularity and
+    where start_time falls within its bin, so it is computed once and
+    shared by every probe of the job and by every job of the same shape.
+    """
+    g = granularity.seconds
+    start = start_time.seconds
+    return start // g, _make_profile(skyline_shape(blocks), g, start % g)
+
+
+@lru_cache(maxsize=65536)
+def _make_profile(shape: SkylineShape, granularity: int, phase: int) -> SkylineProfile:
+    runs: List[Tuple[int, int, float]] = []
+    time = phase
+    for duration, size in shape:
+        end = time + duration
+        first, last = time // granularity, (end - 1) // granularity
+        time = end
+        if runs and first <= runs[-1][1]:
+            # The block starts in the last bin of the previous one
+            prev_first, prev_last, prev_size = runs[-1]
+            if size <= prev_size:
+                first = prev_last + 1
+            elif prev_first == prev_last:
+                runs.pop()
+            else:
+                runs[-1] = (prev_first, prev_last - 1, prev_size)
+        if last < first:
+            continue
+        if runs and runs[-1][1] == first - 1 and runs[-1][2] == size:
+            runs[-1] = (runs[-1][0], last, size)
+        else:
+            runs.append((first, last, size))
+    return SkylineProfile(tuple(runs))
+
+
 class SkylineTracker:
     """
     This abstraction represents a global skyline of jobs that have
@@ -32,100 +111,181 @@ class SkylineTracker:
     This abstraction implicitly expects non-negative values for all
     SkylineBlocks (i.e. the allowable range of a skyline is bounded
     by zero_baseline and max_size). Any operation that exceeds these
-    bounds will raise an SkylineBoundsExceeded error
+    bounds will raise an SkylineBoundsExceeded error, can_add/can_remove
+    and try_add report the same condition without raising.
+
+    Updates are applied in place and only touch the bins covered by the
+    job, so every operation costs O(job length) rather than O(skyline size).
+
+    `probes` counts the candidate start times evaluated and `bins_touched`
+    the bins read or written, for instrumentation.
     """
 
+    # Class level defaults, so that every engine has the counters without
+    # having to call this __init__
+    probes: int = 0
+    bins_touched: int = 0
+    # The end of the bins an engine can hold, jobs reaching past it never
+    # fit. None for engines without one.
+    horizon: Optional[TimeInterval] = None
+    # The horizon of the engine's trackers unless they are given another,
+    # readable without building one
+    default_horizon: Optional[TimeInterval] = None
+
     def __init__(self, granularity: TimeInterval, max_size: float) -> None:
         self._granularity = granularity
         self._max_size = max_size
-        self.time_series: Dict[TimeInterval, float] = {}
+        self._bins: Dict[int, float] = {}
+        # Mirrors _bins to answer range-max queries
+        self._index: RangeMaxTree = RangeMaxTree()
 
     @property
     def granularity(self) -> TimeInterval:
         return self._granularity
 
+    @property
+    def time_series(self) -> Dict[TimeInterval, float]:
+        g = self._granularity.seconds
+        return {Seconds(t_bin * g): size for t_bin, size in self._bins.items()}
+
+    def latest_feasible_start(
+        self,
+        blocks: List[SkylineBlock],
+        min_start: TimeInterval,
+        max_start: TimeInterval,
+    ) -> Optional[TimeInterval]:
+        """
+        Returns the latest start time in max_start, max_start - granularity,
+        ... down to min_start at which the job can be added, or None if there
+        is no such start time.
+
+        This gives the same answer as probing can_add at every step, but a
+        range-max query over the bins of each run of the job's profile finds
+        the leftmost bin that is too full, and every start time that would
+        still overlap that bin is skipped without being probed.
+        """
+        if max_start < min_start:
+            return None
+        g = self._granularity.seconds
+        first_bin, profile = skyline_profile(blocks, self._granularity, max_start)
+        if profile.max_size > self._max_size:
+            return None
+
+        max_steps = (max_start.seconds - min_start.seconds) // g
+        steps = 0
+        while steps <= max_steps:
+            self.probes += 1
+            start_bin = first_bin - steps
+            next_start_bin = None
+            for first, last, size in profile.runs:
+                limit = self._max_size - size + _INDEX_TOLERANCE
+                too_full = self._first_above(start_bin + first, start_bin + last, limit)
+                if too_full is not None:
+                    next_start_bin = too_full - last - 1
+                    break
+            if next_start_bin is not None:
+                steps = first_bin - next_start_bin
+                continue
+            if self._fits(start_bin, profile, 1):
+                return Seconds(max_start.seconds - steps * g)
+            steps += 1
+        return None
+
     def can_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
-        try:
-            self._get_updated_time_series(start_time, blocks, operator.add)
-            return True
-        except Exception:
-            return False
+        self.probes += 1
+        return self._fits(*skyline_profile(blocks, self._granularity, start_time), 1)
 
     def can_remove(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
-        try:
-            self._get_updated_time_series(start_time, blocks, operator.sub)
-            return True
-        except Exception:
+        self.probes += 1
+        return self._fits(*skyline_profile(blocks, self._granularity, start_time), -1)
+
+    def try_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        """
+        Adds the job if it fits and reports whether it did. This is
+        equivalent to can_add followed by add_job, but only looks up the
+        job's profile once.
+        """
+        self.probes += 1
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, 1):
             return False
+        self._apply(first_bin, profile, 1)
+        return True
 
     def add_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
-        self.time_series = self._get_updated_time_series(
-            start_time, blocks, operator.add
-        )
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, 1):
+            raise SkylineBoundsExceeded()
+        self._apply(first_bin, profile, 1)
 
     def remove_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
-        self.time_series = self._get_updated_time_series(
-            start_time, blocks, operator.sub
-        )
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, -1):
+            raise SkylineBoundsExceeded()
+        self._apply(first_bin, profile, -1)
 
-    def _get_updated_time_series(
-        self,
-        start_time: TimeInterval,
-        blocks: List[SkylineBlock],
-        op: Callable[[float, float], float],
-    ) -> Dict[TimeInterval, float]:
-        return self._merge_time_series(
-            self.time_series, self._make_time_series(start_time, blocks), op
-        )
+    def _fits(self, first_bin: int, profile: SkylineProfile, sign: int) -> bool:
+        """
+        Only the bins covered by the job are read, every other bin keeps
+        its (already valid) size.
+        """
+        bins = self._bins
+        for first, last, size in profile.runs:
+            self.bins_touched += last - first + 1
+            for t_bin in range(first_bin + first, first_bin + last + 1):
+                new_size = bins.get(t_bin, 0) + sign * size
+                if not (0 <= new_size <= self._max_size):
+                    return False
+        return True
 
-    def _merge_time_series(
-        self,
-        series_a: Dict[TimeInterval, float],
-        series_b: Dict[TimeInterval, float],
-        op: Callable[[float, float], float],
-    ) -> Dict[TimeInterval, float]:
-        all_times = set(series_a.keys()).union(series_b)
-        new_time_series = {}
-        for time in all_times:
-            new_size = op(series_a.get(time, 0), series_b.get(time, 0))
-            new_time_series[time] = new_size
-            if not (0 <= new_size <= self._max_size):
-                raise SkylineBoundsExceeded()
-        return new_time_series
-
-    def _make_time_series(
-        self, start_time: TimeInterval, blocks: List[SkylineBlock]
-    ) -> Dict[TimeInterval, float]:
-        time = start_time
-        block_to_time_bins = []
-        for block in blocks:
-            start = self._bin(time)
-            inclusive_end = self._bin(time + block.duration - Seconds(1))
-            bins = list(
-                self._time_range(start, inclusive_end, self.granularity, inclusive=True)
-            )
-            block_to_time_bins.append((block, bins))
-            time += block.duration
-
-        time_series = {}
-        for block, bins in block_to_time_bins:
-            for t_bin in bins:
-                time_series[t_bin] = max(time_series.get(t_bin, 0), block.size)
-        return time_series
-
-    def _bin(self, time: TimeInterval) -> TimeInterval:
-        return Seconds(
-            (time.seconds // self._granularity.seconds) * self._granularity.seconds
-        )
-
-    def _time_range(
-        self,
-        start: TimeInterval,
-        end: TimeInterval,
-        step: TimeInterval,
-        inclusive: bool = False,
-    ) -> Generator[TimeInterval, None, None]:
-        time = start
-        while time < end or (inclusive and time == end):
-            yield time
-            time += step
+    def _apply(self, first_bin: int, profile: SkylineProfile, sign: int) -> None:
+        bins = self._bins
+        for first, last, size in profile.runs:
+            self.bins_touched += last - first + 1
+            for t_bin in range(first_bin + first, first_bin + last + 1):
+                new_size = bins.get(t_bin, 0) + sign * size
+                bins[t_bin] = new_size
+                self._index[t_bin] = new_size
+
+    def _first_above(self, lo: int, hi: int, limit: float) -> Optional[int]:
+        """
+        The leftmost bin index in [lo, hi] whose size is above `limit`
+        """
+        return self._index.first_above(lo, hi, limit)
+
+    def _max_level(self, lo: int, hi: int) -> float:
+        """
+        The largest size of the bins in [lo, hi]
+        """
+        return self._index.max(lo, hi)
+
+
+def get_skyline_tracker(
+    engine: str, granularity: TimeInterval, max_size: float, **kwargs: Any
+) -> SkylineTracker:
+    """
+    A tracker of the given engine, see get_skyline_engine
+    """
+    return get_skyline_engine(engine)(granularity=granularity, max_size=max_size, **kwargs)
+
+
+def get_skyline_engine(engine: str) -> Type[SkylineTracker]:
+    """
+    This is the registry of all available skyline engines. Engines with
+    heavy dependencies are only imported when they are selected.
+
+    "dict": SkylineTracker, a sparse dict of bins with no horizon
+    "array": ArraySkylineTracker, a dense NumPy array over a fixed horizon
+    "steps": StepSkylineTracker, the breakpoints where the level changes
+    """
+    if engine == "dict":
+        return SkylineTracker
+    elif engine == "array":
+        from common.skyline_array import ArraySkylineTracker
+
+        return ArraySkylineTracker
+    elif engine == "steps":
+        from common.skyline_steps import StepSkylineTracker
+
+        return StepSkylineTracker
+    raise KeyError(f"Unknown skyline engine: {engine}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+from common.skyline_math import (
+    SkylineBlock,
+    SkylineBoundsExceeded,
+    SkylineProfile,
+    SkylineTracker,
+    skyline_profile,
+)
+from common.time_interval import Seconds, TimeInterval
+
+
+__ALL__ = ["StepSkylineTracker"]
+
+
+class StepSkylineTracker(SkylineTracker):
+    """
+    A SkylineTracker that stores the global skyline as a step function:
+    an ordered list of the bins where the level changes, and the level from
+    each of those bins up to the next one. The last level extends forever.
+
+    Storage and the cost of every operation scale with the number of
+    breakpoints (at most two per scheduled job) that the job overlaps,
+    rather than with the number of bins it covers, so fine granularities
+    over long horizons stay cheap. Accordingly, `bins_touched` counts the
+    breakpoints visited.
+    """
+
+    def __init__(self, granularity: TimeInterval, max_size: float) -> None:
+        # The breakpoints replace SkylineTracker.time_series and its index
+        # entirely, so the parent __init__ is deliberately not called
+        self._granularity = granularity
+        self._max_size = max_size
+        self._breakpoints: List[int] = [0]
+        self._levels: List[float] = [0.0]
+
+    @property
+    def time_series(self) -> Dict[TimeInterval, float]:
+        """
+        The non-zero bins of the skyline, expanded bin by bin. This is only
+        meant for inspection, its cost grows with the number of bins.
+        """
+        g = self._granularity.seconds
+        time_series = {}
+        for i, level in enumerate(self._levels[:-1]):
+            if level:
+                for t_bin in range(self._breakpoints[i], self._breakpoints[i + 1]):
+                    time_series[Seconds(t_bin * g)] = level
+        return time_series
+
+    def can_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        return self._fits(*skyline_profile(blocks, self._granularity, start_time), 1)
+
+    def can_remove(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        return self._fits(*skyline_profile(blocks, self._granularity, start_time), -1)
+
+    def try_add(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> bool:
+        self.probes += 1
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, 1):
+            return False
+        self._apply(first_bin, profile, 1)
+        return True
+
+    def add_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, 1):
+            raise SkylineBoundsExceeded()
+        self._apply(first_bin, profile, 1)
+
+    def remove_job(self, start_time: TimeInterval, blocks: List[SkylineBlock]) -> None:
+        first_bin, profile = skyline_profile(blocks, self._granularity, start_time)
+        if not self._fits(first_bin, profile, -1):
+            raise SkylineBoundsExceeded()
+        self._apply(first_bin, profile, -1)
+
+    def _fits(self, first_bin: int, profile: SkylineProfile, sign: int) -> bool:
+        breakpoints, levels = self._breakpoints, self._levels
+        for first, last, size in profile.runs:
+            lo, hi = first_bin + first, first_bin + last
+            i = bisect_right(breakpoints, lo) - 1
+            while i < len(breakpoints) and breakpoints[i] <= hi:
+                self.bins_touched += 1
+                new_size = levels[i] + sign * size
+                if not (0 <= new_size <= self._max_size):
+                    return False
+                i += 1
+        return True
+
+    def _apply(self, first_bin: int, profile: SkylineProfile, sign: int) -> None:
+        for first, last, size in profile.runs:
+            if size:
+                self._range_add(first_bin + first, first_bin + last, sign * size)
+
+    def _range_add(self, lo: int, hi: int, delta: float) -> None:
+        breakpoints, levels = self._breakpoints, self._levels
+        i = self._split(lo)
+        j = self._split(hi + 1)
+        for k in range(i, j):
+            levels[k] += delta
+        # Drop breakpoints that no longer change the level
+        if j < len(breakpoints) and levels[j] == levels[j - 1]:
+            del breakpoints[j], levels[j]
+        if i > 0 and levels[i] == levels[i - 1]:
+            del breakpoints[i], levels[i]
+
+    def _split(self, position: int) -> int:
+        """
+        Makes `position` a breakpoint (without changing the skyline) and
+        returns its index
+        """
+        i = bisect_right(self._breakpoints, position) - 1
+        if self._breakpoints[i] != position:
+            i += 1
+            self._breakpoints.insert(i, position)
+            self._levels.insert(i, self._levels[i - 1])
+        return i
+
+    def _first_above(self, lo: int, hi: int, limit: float) -> Optional[int]:
+        breakpoints, levels = self._breakpoints, self._levels
+        i = bisect_right(breakpoints, lo) - 1
+        while i < len(breakpoints) and breakpoints[i] <= hi:
+            if levels[i] > limit:
+                return max(breakpoints[i], lo)
+            i += 1
+        return None
+
+    def _max_level(self, lo: int, hi: int) -> float:
+        breakpoints, levels = self._breakpoints, self._levels
+        i = bisect_right(breakpoints, lo) - 1
+        result = levels[i]
+        i += 1
+        while i < len(breakpoints) and breakpoints[i] <= hi:
+            self.bins_touched += 1
+            result = max(result, levels[i])
+            i += 1
+        return result
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from common.blocking import run_blocking, sqlite_transaction
+
+
+class TestBlocking(unittest.TestCase):
+
+    def test_run_blocking(self) -> None:
+        self.assertNotEqual(
+            asyncio.run(run_blocking(threading.get_ident)), threading.get_ident()
+        )
+        self.assertEqual(asyncio.run(run_blocking(divmod, 7, 2)), (3, 1))
+
+    def test_sqlite_transaction(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.sqlite")
+            with sqlite_transaction(path) as connection:
+                connection.execute("CREATE TABLE t (x INTEGER)")
+                connection.execute("INSERT INTO t VALUES (1)")
+            with self.assertRaises(RuntimeError):
+                with sqlite_transaction(path) as connection:
+                    connection.execute("INSERT INTO t VALUES (2)")
+                    raise RuntimeError()
+            with sqlite_transaction(path) as connection:
+                self.assertEqual(connection.execute("SELECT x FROM t").fetchall(), [(1,)])
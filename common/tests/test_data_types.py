@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import dataclasses
+import pickle
+import unittest
+
+from common.data_types import TaskInstance, UniqueTask
+from common.time_interval import Days, Seconds
+from common.timestamp import Timestamp
+
+
+class TestTaskInstance(unittest.TestCase):
+
+    def test_immutable(self) -> None:
+        task = TaskInstance("task", Timestamp(10))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            task.task_id = "other"  # pyre-ignore[41]
+
+    def test_unique_task_is_cached(self) -> None:
+        task = TaskInstance("task", Timestamp(10))
+        self.assertEqual(task.unique_task, UniqueTask("task", Seconds(10)))
+        self.assertIs(task.unique_task, task.unique_task)
+
+    def test_equality_and_pickling(self) -> None:
+        task = TaskInstance("".join(["ta", "sk"]), Timestamp(10))
+        same = TaskInstance("task", Timestamp(10))
+        self.assertIs(task.task_id, same.task_id)
+        self.assertEqual({task: 1}[same], 1)
+        self.assertNotEqual(task, TaskInstance("task", Timestamp(11)))
+        self.assertEqual(pickle.loads(pickle.dumps(task)), same)
+        self.assertEqual(hash(pickle.loads(pickle.dumps(task))), hash(same))
+
+    def test_build_many(self) -> None:
+        tasks = TaskInstance.build_many([("task", Timestamp(10)), ("other", Timestamp(0))])
+        self.assertEqual(tasks, [TaskInstance("task", Timestamp(10)), TaskInstance("other", Timestamp(0))])
+        self.assertEqual(hash(tasks[0]), hash(TaskInstance("task", Timestamp(10))))
+        self.assertEqual(tasks[0].unique_task, UniqueTask("task", Seconds(10)))
+
+
+class TestUniqueTask(unittest.TestCase):
+
+    def test_offset_within_a_day(self) -> None:
+        with self.assertRaises(ValueError):
+            UniqueTask("task", Days(1))
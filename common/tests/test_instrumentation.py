@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import unittest
+
+from algorithm.right_based.algorithm import schedule_tasks
+from algorithm.right_based.metadata import RightBasedMetadata
+from common import instrumentation
+from common.data_types import UniqueTask
+from common.instrumentation import InstrumentationSink, RecordingSink
+from common.skyline_math import SkylineBlock
+from common.time_interval import Seconds
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_null_sink_by_default(self) -> None:
+        self.assertIs(type(instrumentation.get_sink()), InstrumentationSink)
+        with instrumentation.timer("phase"):
+            instrumentation.increment("counter")
+        self.assertEqual(instrumentation.get_sink().end_run(), {})
+
+    def test_schedule_tasks_counters(self) -> None:
+        skyline = [SkylineBlock(Seconds(1), 1)]
+        pool = {
+            UniqueTask(f"task_{i}", Seconds(0)): RightBasedMetadata(
+                min_start_time=Seconds(0),
+                max_start_time=Seconds(1),
+                skyline=skyline,
+            )
+            for i in range(3)
+        }
+        sink = RecordingSink()
+        sink.begin_run()
+        with instrumentation.use_sink(sink), instrumentation.timer("schedule"):
+            schedule_tasks(pool, granularity=Seconds(1), max_size=1)
+        report = sink.end_run()
+
+        self.assertEqual(report["timers"]["schedule"]["count"], 1)
+        counters = report["counters"]
+        self.assertEqual(counters["schedule_tasks.tasks_accepted"], 2)
+        self.assertEqual(counters["schedule_tasks.tasks_rejected"], 1)
+        # 1 probe for the first task, 2 for the second, and the rejected one
+        # resumes where the second landed, 1
+        self.assertEqual(counters["schedule_tasks.skyline_probes"], 4)
+        self.assertEqual(
+            report["distributions"]["schedule_tasks.probes_per_task"]["max"], 2
+        )
+        self.assertIs(type(instrumentation.get_sink()), InstrumentationSink)
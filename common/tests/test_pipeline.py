@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import unittest
+from typing import AsyncIterator, List
+
+from common.pipeline import buffered, iterate
+
+
+class TestBuffered(unittest.TestCase):
+
+    def test_order(self) -> None:
+        async def collect() -> List[int]:
+            return [item async for item in buffered(iterate(range(10)), 2)]
+
+        self.assertEqual(asyncio.run(collect()), list(range(10)))
+
+    def test_backpressure(self) -> None:
+        produced = []
+
+        async def source() -> AsyncIterator[int]:
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        async def consume_one() -> int:
+            items = buffered(source(), 2)
+            first = await items.__anext__()
+            # Let the producer run as far ahead as it can
+            for _ in range(10):
+                await asyncio.sleep(0)
+            await items.aclose()
+            return first
+
+        self.assertEqual(asyncio.run(consume_one()), 0)
+        # Two items queued, and one waiting to be put
+        self.assertEqual(produced, [0, 1, 2, 3])
+
+    def test_errors_reach_the_consumer(self) -> None:
+        async def source() -> AsyncIterator[int]:
+            yield 1
+            raise ValueError("fetch failed")
+
+        async def collect() -> List[int]:
+            return [item async for item in buffered(source(), 4)]
+
+        with self.assertRaisesRegex(ValueError, "fetch failed"):
+            asyncio.run(collect())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import unittest
+
+from common.skyline_hierarchy import CoarseToFineSkylineTracker
+from common.skyline_math import (
+    SkylineBlock,
+    SkylineBoundsExceeded,
+    get_skyline_engine,
+    get_skyline_tracker,
+    skyline_profile,
+)
+from common.time_interval import Days, Hours, Minutes, Seconds
+
+
+class TestSkylineProfile(unittest.TestCase):
+
+    def test_runs(self) -> None:
+        blocks = [
+            SkylineBlock(Seconds(90), 1.0),
+            SkylineBlock(Seconds(60), 1.0),
+            SkylineBlock(Seconds(45), 2.0),
+        ]
+        first_bin, profile = skyline_profile(blocks, Minutes(1), Seconds(125))
+        self.assertEqual(first_bin, 2)
+        # 2:05 - 4:35 has size 1, the bin of 4:35 is shared with the size 2
+        # block which runs until 5:20
+        self.assertEqual(profile.runs, ((0, 1, 1.0), (2, 3, 2.0)))
+
+    # Jobs of the same shape whose start times fall at the same point of a
+    # bin share one profile
+    def test_memoized_by_shape(self) -> None:
+        _, profile_a = skyline_profile(
+            [SkylineBlock(Seconds(90), 1.0)], Minutes(1), Seconds(10)
+        )
+        _, profile_b = skyline_profile(
+            [SkylineBlock(Seconds(90), 1.0)], Minutes(1), Seconds(190)
+        )
+        self.assertIs(profile_a, profile_b)
+
+
+class TestSkylineTracker(unittest.TestCase):
+
+    def test_try_add(self) -> None:
+        blocks = [SkylineBlock(Seconds(2), 1.0)]
+        for engine in ("dict", "array", "steps"):
+            tracker = get_skyline_tracker(engine, granularity=Seconds(1), max_size=1)
+            self.assertTrue(tracker.try_add(Seconds(3), blocks))
+            self.assertFalse(tracker.try_add(Seconds(4), blocks))
+            self.assertEqual(
+                tracker.time_series, {Seconds(3): 1.0, Seconds(4): 1.0}
+            )
+
+    # A busy region must be skipped in one jump, and the answer must match
+    # probing every start time from max_start down
+    def test_latest_feasible_start(self) -> None:
+        blocks = [SkylineBlock(Seconds(3), 1.0), SkylineBlock(Seconds(2), 2.0)]
+        for engine in ("dict", "array", "steps"):
+            tracker = get_skyline_tracker(engine, granularity=Seconds(1), max_size=3)
+            tracker.add_job(Seconds(20), [SkylineBlock(Seconds(30), 2.0)])
+            tracker.add_job(Seconds(5), [SkylineBlock(Seconds(1), 3.0)])
+            self.assertEqual(
+                tracker.latest_feasible_start(blocks, Seconds(0), Seconds(40)),
+                Seconds(15),
+            )
+            self.assertEqual(
+                tracker.latest_feasible_start(blocks, Seconds(0), Seconds(16)),
+                Seconds(15),
+            )
+            self.assertEqual(
+                tracker.latest_feasible_start(blocks, Seconds(0), Seconds(5)),
+                Seconds(0),
+            )
+            self.assertIsNone(
+                tracker.latest_feasible_start(blocks, Seconds(1), Seconds(5))
+            )
+
+    def test_add_job_out_of_bounds(self) -> None:
+        tracker = get_skyline_tracker("dict", granularity=Seconds(1), max_size=1)
+        with self.assertRaises(SkylineBoundsExceeded):
+            tracker.add_job(Seconds(0), [SkylineBlock(Seconds(1), 2.0)])
+        self.assertEqual(tracker.time_series, {})
+
+
+class TestArraySkylineTracker(unittest.TestCase):
+
+    # The array engine must agree with the dict engine, including on bins
+    # shared by two blocks of one job
+    def test_matches_dict_engine(self) -> None:
+        blocks = [
+            SkylineBlock(Seconds(90), 1.0),
+            SkylineBlock(Seconds(45), 2.0),
+            SkylineBlock(Seconds(30), 0.5),
+        ]
+        starts = [Seconds(0), Seconds(30), Seconds(61), Seconds(200)]
+        trackers = [
+            get_skyline_tracker(engine, granularity=Minutes(1), max_size=4)
+            for engine in ("dict", "array")
+        ]
+        for start in starts:
+            answers = {t.can_add(start, blocks) for t in trackers}
+            self.assertEqual(len(answers), 1)
+            if answers.pop():
+                for tracker in trackers:
+                    tracker.add_job(start, blocks)
+        self.assertEqual(
+            {k: v for k, v in trackers[0].time_series.items() if v},
+            trackers[1].time_series,
+        )
+
+    def test_remove_job(self) -> None:
+        blocks = [SkylineBlock(Seconds(2), 1.0)]
+        tracker = get_skyline_tracker("array", granularity=Seconds(1), max_size=1)
+        tracker.add_job(Seconds(3), blocks)
+        self.assertFalse(tracker.can_add(Seconds(4), blocks))
+        self.assertFalse(tracker.can_remove(Seconds(2), blocks))
+        tracker.remove_job(Seconds(3), blocks)
+        self.assertEqual(tracker.time_series, {})
+        with self.assertRaises(SkylineBoundsExceeded):
+            tracker.remove_job(Seconds(3), blocks)
+
+    def test_horizon(self) -> None:
+        blocks = [SkylineBlock(Seconds(2), 1.0)]
+        tracker = get_skyline_tracker(
+            "array", granularity=Seconds(1), max_size=1, horizon=Seconds(10)
+        )
+        self.assertTrue(tracker.can_add(Seconds(8), blocks))
+        self.assertFalse(tracker.can_add(Seconds(9), blocks))
+
+    # Readable from the engine, without allocating its array
+    def test_default_horizon(self) -> None:
+        for engine in ("dict", "array", "steps"):
+            tracker = get_skyline_tracker(engine, granularity=Minutes(1), max_size=1)
+            self.assertEqual(get_skyline_engine(engine).default_horizon, tracker.horizon)
+        self.assertEqual(get_skyline_engine("array").default_horizon, Days(2))
+        with self.assertRaises(KeyError):
+            get_skyline_engine("unknown")
+
+
+class TestStepSkylineTracker(unittest.TestCase):
+
+    def test_breakpoints_follow_jobs(self) -> None:
+        tracker = get_skyline_tracker("steps", granularity=Seconds(1), max_size=3)
+        tracker.add_job(Seconds(10), [SkylineBlock(Seconds(86400), 1.0)])
+        tracker.add_job(Seconds(20), [SkylineBlock(Seconds(5), 2.0)])
+        self.assertEqual(tracker._breakpoints, [0, 10, 20, 25, 86410])
+        self.assertFalse(tracker.can_add(Seconds(24), [SkylineBlock(Seconds(1), 1.0)]))
+        tracker.remove_job(Seconds(20), [SkylineBlock(Seconds(5), 2.0)])
+        self.assertEqual(tracker._breakpoints, [0, 10, 86410])
+        tracker.remove_job(Seconds(10), [SkylineBlock(Seconds(86400), 1.0)])
+        self.assertEqual(tracker._breakpoints, [0])
+
+
+class TestCoarseToFineSkylineTracker(unittest.TestCase):
+
+    # The coarse skyline may only change how many fine probes are needed,
+    # never the answer
+    def test_matches_fine_tracker(self) -> None:
+        blocks = [SkylineBlock(Seconds(3), 1.0), SkylineBlock(Seconds(2), 2.0)]
+        for engine in ("dict", "array", "steps"):
+            fine = get_skyline_tracker(engine, granularity=Seconds(1), max_size=3)
+            tracker = CoarseToFineSkylineTracker(
+                get_skyline_tracker(engine, granularity=Seconds(1), max_size=3),
+                Seconds(10),
+            )
+            for t in (fine, tracker):
+                t.add_job(Seconds(20), [SkylineBlock(Seconds(30), 2.0)])
+                t.add_job(Seconds(5), [SkylineBlock(Seconds(1), 3.0)])
+            for min_start, max_start in [(0, 40), (0, 16), (0, 5), (1, 5), (50, 70)]:
+                self.assertEqual(
+                    tracker.latest_feasible_start(blocks, Seconds(min_start), Seconds(max_start)),
+                    fine.latest_feasible_start(blocks, Seconds(min_start), Seconds(max_start)),
+                )
+            # Once the long job is gone, its coarse bins have room again, and
+            # the fine tracker only confirms the coarse answer
+            tracker.remove_job(Seconds(20), [SkylineBlock(Seconds(30), 2.0)])
+            fine_probes = tracker._fine.probes
+            self.assertEqual(
+                tracker.latest_feasible_start(blocks, Seconds(0), Seconds(40)), Seconds(40)
+            )
+            self.assertEqual(tracker._fine.probes, fine_probes + 1)
+
+    # The array engine can't place anything past its horizon, the coarse
+    # skyline must not lead the search there
+    def test_respects_fine_horizon(self) -> None:
+        blocks = [SkylineBlock(Minutes(5), 1.0)]
+        fine = get_skyline_tracker("array", granularity=Minutes(1), max_size=1)
+        tracker = CoarseToFineSkylineTracker(
+            get_skyline_tracker("array", granularity=Minutes(1), max_size=1), Hours(1)
+        )
+        self.assertEqual(tracker.horizon, fine.horizon)
+        expected = fine.latest_feasible_start(blocks, Seconds(0), Days(3))
+        self.assertEqual(expected, Days(2) - Minutes(5))
+        self.assertEqual(tracker.latest_feasible_start(blocks, Seconds(0), Days(3)), expected)
+        tracker.add_job(expected, blocks)
+        self.assertIsNone(tracker.latest_feasible_start(blocks, Days(2), Days(3)))
+
+    def test_granularities_must_nest(self) -> None:
+        fine = get_skyline_tracker("dict", granularity=Minutes(1), max_size=1)
+        with self.assertRaises(ValueError):
+            CoarseToFineSkylineTracker(fine, Seconds(90))
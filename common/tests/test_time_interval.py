@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import pickle
+import unittest
+
+from common.time_interval import (
+    Days,
+    Hours,
+    InvalidTimeAmount,
+    Minutes,
+    Seconds,
+    TimeInterval,
+    TimeUnit,
+)
+
+
+class TestTimeInterval(unittest.TestCase):
+
+    def test_units(self) -> None:
+        self.assertEqual(Days(1), Hours(24))
+        self.assertEqual(Hours(1), Minutes(60))
+        self.assertEqual(Minutes(1), Seconds(60))
+        self.assertEqual(Seconds(5400).hours, 1)
+        self.assertEqual(Hours(36).rescale(TimeUnit.DAYS), Days(1))
+        self.assertEqual(repr(Minutes(90)), "1:30:00")
+
+    def test_arithmetic(self) -> None:
+        self.assertEqual(Minutes(1) + Seconds(30), Seconds(90))
+        self.assertEqual(Days(3) - Hours(1), Hours(71))
+        self.assertIsInstance(Minutes(1) + Seconds(30), TimeInterval)
+        self.assertGreaterEqual(Minutes(1), Seconds(60))
+        with self.assertRaises(InvalidTimeAmount):
+            Seconds(1) - Seconds(2)
+        with self.assertRaises(InvalidTimeAmount):
+            Minutes(-1)
+
+    def test_interned(self) -> None:
+        self.assertIs(Seconds(10) + Seconds(5), Minutes(1) - Seconds(45))
+        self.assertEqual(pickle.loads(pickle.dumps(Seconds(15))), Seconds(15))
+
+    def test_hash(self) -> None:
+        self.assertEqual({Minutes(1): "a"}[Seconds(30) + Seconds(30)], "a")
@@ -10,118 +10,141 @@ from __future__ import annotations
 
 from enum import Enum
 from datetime import timedelta
+from typing import Dict
 
 
 class TimeInterval(object):
+    """
+    A non-negative amount of time with one second resolution.
+
+    TimeIntervals are immutable and stored as a plain int number of
+    seconds. Arithmetic builds its results straight from that int (without
+    going through the unit dispatch of __init__), and results below
+    _INTERN_LIMIT seconds are interned, so the intervals a planning run
+    creates millions of times are shared rather than allocated.
+    """
+
+    __slots__ = ("_seconds",)
 
     def __init__(self, value: int, unit: TimeUnit) -> None:
-        self._time = timedelta(seconds=0)
-        self._set_time(int(value), unit)
+        value = int(value)
+        if value < 0:
+            raise InvalidTimeAmount(
+                "Invalid input " + str(value) + " time is negative."
+            )
+        self._seconds: int = value * self._seconds_to_multiple(unit)
 
     @property
     def seconds(self) -> int:
-        return self.get_time_scalar(TimeUnit.SECONDS)
+        return self._seconds
 
     @property
     def minutes(self) -> int:
-        return self.get_time_scalar(TimeUnit.MINUTES)
+        return self._seconds // 60
 
     @property
     def hours(self) -> int:
-        return self.get_time_scalar(TimeUnit.HOURS)
+        return self._seconds // 3600
 
     @property
     def days(self) -> int:
-        return self.get_time_scalar(TimeUnit.DAYS)
+        return self._seconds // (3600 * 24)
 
     def get_time_scalar(self, unit: TimeUnit) -> int:
-        return int(self._time.total_seconds()) // self._seconds_to_multiple(unit)
+        return self._seconds // self._seconds_to_multiple(unit)
 
     def rescale(self, output_unit: TimeUnit) -> TimeInterval:
         return TimeInterval(self.get_time_scalar(output_unit), output_unit)
 
     def __repr__(self) -> str:
-        return str(self._time)
+        return str(timedelta(seconds=self._seconds))
 
-    def __eq__(self, other: TimeInterval) -> bool:
-        return other._time == self._time
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TimeInterval):
+            return NotImplemented
+        return other._seconds == self._seconds
 
     def __lt__(self, other: TimeInterval) -> bool:
-        return self._time < other._time
+        return self._seconds < other._seconds
 
     def __le__(self, other: TimeInterval) -> bool:
-        return self._time <= other._time
+        return self._seconds <= other._seconds
 
     def __gt__(self, other: TimeInterval) -> bool:
-        return self._time > other._time
+        return self._seconds > other._seconds
+
+    def __ge__(self, other: TimeInterval) -> bool:
+        return self._seconds >= other._seconds
 
     def __add__(self, other: TimeInterval) -> TimeInterval:
-        total_time_delta = self._time + other._time
-        total_seconds = int(total_time_delta.total_seconds())
-        return TimeInterval(total_seconds, TimeUnit.SECONDS)
+        return _from_seconds(self._seconds + other._seconds)
 
     def __sub__(self, other: TimeInterval) -> TimeInterval:
-        if other._time > self._time:
+        if other._seconds > self._seconds:
             raise InvalidTimeAmount(
                 "{} - {} results in negative time. Use the timedelta class.",
                 self, other,
             )
-        total_time_delta = self._time - other._time
-        total_seconds = int(total_time_delta.total_seconds())
-        return TimeInterval(total_seconds, TimeUnit.SECONDS)
+        return _from_seconds(self._seconds - other._seconds)
 
     def __hash__(self) -> int:
-        return self.seconds
+        return self._seconds
 
     def _seconds_to_multiple(self, unit: TimeUnit) -> int:
-        if unit == TimeUnit.SECONDS:
-            return 1
-        if unit == TimeUnit.MINUTES:
-            return 60
-        if unit == TimeUnit.HOURS:
-            return 3600
-        elif unit == TimeUnit.DAYS:
-            return 3600 * 24
-        else:
+        try:
+            return _SECONDS_PER_UNIT[unit]
+        except KeyError:
             raise NotImplementedError('Programmer failed to add a enum option.')
 
-    def _set_time(self, value: int, unit: TimeUnit) -> None:
-        if value < 0:
-            raise InvalidTimeAmount(
-                "Invalid input " + str(value) + " time is negative."
-            )
 
-        if unit == TimeUnit.SECONDS:
-            self._time = timedelta(seconds=value)
-        elif unit == TimeUnit.MINUTES:
-            self._time = timedelta(minutes=value)
-        elif unit == TimeUnit.HOURS:
-            self._time = timedelta(hours=value)
-        elif unit == TimeUnit.DAYS:
-            self._time = timedelta(days=value)
-        else:
-            raise NotImplementedError('Programmer failed to add a enum option.')
+# Arithmetic results shorter than this are interned, one day covers every
+# offset within a day and every bin of a day-long skyline
+_INTERN_LIMIT = 24 * 3600
+_interned: Dict[int, TimeInterval] = {}
+
+
+def _from_seconds(seconds: int) -> TimeInterval:
+    """
+    Builds a TimeInterval from a number of seconds already known to be a
+    non-negative int
+    """
+    if seconds < _INTERN_LIMIT:
+        interval = _interned.get(seconds)
+        if interval is None:
+            interval = _interned[seconds] = _new_interval(seconds)
+        return interval
+    return _new_interval(seconds)
+
+
+def _new_interval(seconds: int) -> TimeInterval:
+    interval = object.__new__(TimeInterval)
+    interval._seconds = seconds
+    return interval
 
 
 class Seconds(TimeInterval):
+    __slots__ = ()
 
     def __init__(self, seconds: int) -> None:
         super().__init__(seconds, TimeUnit.SECONDS)
 
 
 class Minutes(TimeInterval):
+    __slots__ = ()
 
     def __init__(self, minutes: int) -> None:
         super().__init__(minutes, TimeUnit.MINUTES)
 
 
 class Hours(TimeInterval):
+    __slots__ = ()
 
     def __init__(self, hours: int) -> None:
         super().__init__(hours, TimeUnit.HOURS)
 
 
 class Days(TimeInterval):
+    __slots__ = ()
 
     def __init__(self, days: int) -> None:
         super().__init__(days, TimeUnit.DAYS)
@@ -136,3 +159,11 @@ class TimeUnit(Enum):
 
 class InvalidTimeAmount(Exception):
     pass
+
+
+_SECONDS_PER_UNIT: Dict[TimeUnit, int] = {
+    TimeUnit.SECONDS: 1,
+    TimeUnit.MINUTES: 60,
+    TimeUnit.HOURS: 3600,
+    TimeUnit.DAYS: 3600 * 24,
+}
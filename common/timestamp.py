@@ -27,6 +27,8 @@ __ALL__ = [
 
 
 class Timestamp(object):
+    __slots__ = ("_time",)
+
     def __init__(self, unixtime: int) -> None:
         if unixtime < 0:
             raise InvalidTime(f"Unixtime cannot be negative: {unixtime}")
@@ -104,6 +106,8 @@ class TimeZero(Timestamp):
     Jan 1st 1970 Midnight UTC
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(0)
 
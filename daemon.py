@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Runs the planner as a long-lived daemon, planning every --interval seconds
+until it receives SIGTERM or SIGINT.
+
+> python3 daemon.py --interval 60
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import os
+
+from algorithm.right_based.metadata import default_resource_pools
+from algorithm.right_based.metadata_cache import cached_resource_pool
+from common.instrumentation import RecordingSink
+from common.time_interval import Seconds
+from planner.config import (
+    PlannerConfig,
+    get_algorithm,
+    get_task_fetcher,
+)
+from planner.daemon import PlannerDaemon
+from planner.plan_writer import PlanWriter
+from planner.planner import Planner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--interval", type=int, default=60, help="seconds between the start of two cycles",
+    )
+    parser.add_argument(
+        "--task-file", help="plan the task instances of this dump instead of the hard coded ones",
+    )
+    parser.add_argument(
+        "--cache-dir", help="keep the metadata cache of every resource pool in this directory",
+    )
+    parser.add_argument(
+        "--max-cycles", type=int, default=None, help="stop after this many cycles",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+
+    # The dump is only parsed again once it changes
+    task_fetcher = (
+        get_task_fetcher("file", args.task_file, reuse_unchanged=True)
+        if args.task_file
+        else get_task_fetcher("hard_coded")
+    )
+    # Metadata is only looked up again once it expires
+    resource_pools = [
+        cached_resource_pool(
+            pool,
+            path=os.path.join(args.cache_dir, f"{pool.name}.sqlite") if args.cache_dir else None,
+        )
+        for pool in default_resource_pools()
+    ]
+    config = PlannerConfig(
+        task_fetcher=task_fetcher,
+        # Skylines are kept between cycles and only updated with what changed
+        scheduling_algorithm=get_algorithm(
+            "right_based", resource_pools=resource_pools, incremental=True,
+        ),
+        plan_writer=PlanWriter(diff=True),
+        instrumentation=RecordingSink(),
+    )
+    planner = Planner(config=config)
+    daemon = PlannerDaemon(planner, Seconds(args.interval))
+    try:
+        return asyncio.run(daemon.run(max_cycles=args.max_cycles))
+    finally:
+        planner.close()
+
+
+if __name__ == "__main__":
+    exit(main())
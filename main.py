@@ -7,7 +7,10 @@
 
 
 import asyncio
+import logging
+import sys
 
+from common.instrumentation import RecordingSink
 from planner.config import (
     PlannerConfig,
     get_algorithm,
@@ -26,13 +29,18 @@ any production code.
 
 
 def main() -> int:
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
     config = PlannerConfig(
         task_fetcher=get_task_fetcher("hard_coded"),
         scheduling_algorithm=get_algorithm("right_based"),
         plan_writer=PlanWriter(),
+        instrumentation=RecordingSink(),
     )
     planner = Planner(config=config)
-    return asyncio.run(planner.run())
+    try:
+        return asyncio.run(planner.run())
+    finally:
+        planner.close()
 
 
 if __name__ == "__main__":
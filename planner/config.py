@@ -7,65 +7,106 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
-from algorithm.algorithm import (
-    SchedulingAlgorithm,
-    NullAlgorithm,
-    ReturnZero,
-    RightBased,
-)
-from algorithm.task_fetchers import (
-    TaskFetcher,
-    HardCodedTaskFetcher,
-)
+from common.instrumentation import InstrumentationSink
+from planner.registry import Registry
 
-from planner.plan_writer import PlanWriter
+if TYPE_CHECKING:
+    from algorithm.algorithm import SchedulingAlgorithm
+    from algorithm.task_fetchers import TaskFetcher
+    from planner.plan_writer import PlanWriter
 
 
 __ALL__ = [
+    "ALGORITHMS",
+    "DEFAULT_TASK_POOL",
     "PlannerConfig",
+    "TASK_FETCHERS",
     "TaskPoolConfig",
     "get_algorithm",
     "get_task_fetcher",
 ]
 
+# This is the official registry of all available planning algorithms
+ALGORITHMS = Registry("algorithm", "clockwork.algorithms", {
+    "do_nothing": "algorithm.algorithm:NullAlgorithm",
+    "return_zero": "algorithm.algorithm:ReturnZero",
+    "right_based": "algorithm.algorithm:RightBased",
+})
+
+# This is the official registry of all available task fetchers
+TASK_FETCHERS = Registry("task fetcher", "clockwork.task_fetchers", {
+    "hard_coded": "algorithm.task_fetchers:HardCodedTaskFetcher",
+    "file": "algorithm.task_fetchers:FileTaskFetcher",
+})
+
+
 def get_algorithm(short_name: str, *args, **kwargs) -> SchedulingAlgorithm:
     """
-    This is the official registry of all available planning algorithms
+    Only the module of the selected algorithm is imported
     """
-    registry = {
-        "do_nothing": NullAlgorithm,
-        "return_zero": ReturnZero,
-        "right_based": RightBased,
-    }
-    return registry[short_name](*args, **kwargs)
+    return ALGORITHMS.get(short_name)(*args, **kwargs)
 
 
 def get_task_fetcher(short_name: str, *args, **kwargs) -> TaskFetcher:
     """
-    This is the official registry of all available task fetchers
+    Only the module of the selected task fetcher is imported
     """
-    registry = {
-        "hard_coded": HardCodedTaskFetcher,
-    }
-    return registry[short_name](*args, **kwargs)
+    return TASK_FETCHERS.get(short_name)(*args, **kwargs)
+
+
+# The name of the pool given to PlannerConfig as a fetcher and an algorithm
+DEFAULT_TASK_POOL = "default"
 
 
 @dataclass
 class TaskPoolConfig:
     task_fetcher: TaskFetcher
     scheduling_algorithm: SchedulingAlgorithm
+    # How many fetched batches may wait for the algorithm
+    max_pending_batches: int = 4
 
 
 class PlannerConfig:
+    """
+    Either a single task pool, given by its fetcher and algorithm, or any
+    number of named `task_pools`. Planner.run plans up to
+    `max_concurrent_pools` of them at once.
+    """
+
     def __init__(
         self,
-        task_fetcher: TaskFetcher,
-        scheduling_algorithm: SchedulingAlgorithm,
+        task_fetcher: Optional[TaskFetcher] = None,
+        scheduling_algorithm: Optional[SchedulingAlgorithm] = None,
         plan_writer: Optional[PlanWriter] = None,
+        instrumentation: Optional[InstrumentationSink] = None,
+        max_pending_batches: int = 4,
+        task_pools: Optional[Dict[str, TaskPoolConfig]] = None,
+        max_concurrent_pools: int = 8,
     ) -> None:
-        self.task_pool: TaskPoolConfig = TaskPoolConfig(
-            task_fetcher, scheduling_algorithm
-        )
+        self.task_pools: Dict[str, TaskPoolConfig] = dict(task_pools or {})
+        if task_fetcher is not None and scheduling_algorithm is not None:
+            if DEFAULT_TASK_POOL in self.task_pools:
+                raise ValueError(f"Task pool {DEFAULT_TASK_POOL} is configured twice")
+            self.task_pools[DEFAULT_TASK_POOL] = TaskPoolConfig(
+                task_fetcher, scheduling_algorithm, max_pending_batches
+            )
+        elif task_fetcher is not None or scheduling_algorithm is not None:
+            raise ValueError("A task pool needs both a task fetcher and an algorithm")
+        if not self.task_pools:
+            raise ValueError("No task pool configured")
+        self.max_concurrent_pools: int = max_concurrent_pools
         self.plan_writer: Optional[PlanWriter] = plan_writer
+        # Receives the phase timings and counters of every run, see
+        # common.instrumentation. Defaults to a sink that drops everything.
+        self.instrumentation: InstrumentationSink = (
+            instrumentation or InstrumentationSink()
+        )
+
+    @property
+    def task_pool(self) -> TaskPoolConfig:
+        """
+        The first task pool, for configs with a single one
+        """
+        return next(iter(self.task_pools.values()))
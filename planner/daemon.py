@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import signal
+from typing import Optional
+
+from common.time_interval import TimeInterval
+from planner.planner import Planner
+
+
+__ALL__ = ["PlannerDaemon"]
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class PlannerDaemon:
+    """
+    Runs a Planner every `interval` in a single long-lived process, so
+    everything its fetchers and algorithms keep between runs (parsed task
+    dumps, incremental skylines, pending tasks, worker processes, ...)
+    stays warm from one cycle to the next.
+
+    Cycles start on a fixed grid of the interval. A cycle that overruns
+    makes the daemon skip the grid points it missed, rather than starting
+    the next cycles back to back.
+
+    SIGTERM and SIGINT stop the daemon once the current cycle, and its
+    plan write, are finished.
+    """
+
+    def __init__(self, planner: Planner, interval: TimeInterval) -> None:
+        if interval.seconds <= 0:
+            raise ValueError(f"The planning interval must be positive, got {interval}")
+        self.planner = planner
+        self.interval = interval
+        self.cycles: int = 0
+        self.cycles_skipped: int = 0
+        self._stopping: Optional[asyncio.Event] = None
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, max_cycles: Optional[int] = None) -> int:
+        """
+        Runs cycles until stopped, or until `max_cycles` have run. Returns
+        the result of the last cycle.
+        """
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        signals = [signal.SIGTERM, signal.SIGINT]
+        for sig in signals:
+            loop.add_signal_handler(sig, self._on_signal, sig)
+        ret_code = 0
+        try:
+            next_start = loop.time()
+            while not self._stopping.is_set():
+                ret_code = await self.planner.run()
+                self.cycles += 1
+                if max_cycles is not None and self.cycles >= max_cycles:
+                    break
+                next_start += self.interval.seconds
+                now = loop.time()
+                if now > next_start:
+                    skipped = math.ceil((now - next_start) / self.interval.seconds)
+                    next_start += skipped * self.interval.seconds
+                    self.cycles_skipped += skipped
+                    logger.warning(
+                        "Planning cycle overran the %s interval, skipping %d cycle(s)",
+                        self.interval, skipped,
+                    )
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._stopping.wait(), next_start - now)
+        finally:
+            for sig in signals:
+                loop.remove_signal_handler(sig)
+            self._stopping = None
+        logger.info("Planner daemon stopped after %d cycle(s)", self.cycles)
+        return ret_code
+
+    def _on_signal(self, sig: signal.Signals) -> None:
+        logger.info("Received %s, stopping after the current cycle", sig.name)
+        self.stop()
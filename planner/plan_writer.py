@@ -7,24 +7,201 @@
 from __future__ import annotations
 
 import logging
-import sys
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
-from common.data_types import UnixtimeAssignments
+from common import instrumentation
+from common.blocking import run_blocking, sqlite_transaction
+from common.data_types import TaskInstance, UnixtimeAssignments
+from common.timestamp import Timestamp
 
 
-__ALL__ = ["PlanWriter"]
+__ALL__ = ["PlanWriter", "PlanDiff", "SQLitePlanWriter", "diff_plans"]
 
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+T = TypeVar("T")
+
+
+@dataclass
+class PlanDiff:
+    """
+    What changed between two plans
+    """
+    inserts: Dict[TaskInstance, Timestamp] = field(default_factory=dict)
+    updates: Dict[TaskInstance, Timestamp] = field(default_factory=dict)
+    deletes: FrozenSet[TaskInstance] = frozenset()
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+def diff_plans(old: UnixtimeAssignments, new: UnixtimeAssignments) -> PlanDiff:
+    inserts = {}
+    updates = {}
+    for task, time in new.items():
+        old_time = old.get(task)
+        if old_time is None:
+            inserts[task] = time
+        elif old_time.unixtime != time.unixtime:
+            updates[task] = time
+    return PlanDiff(inserts, updates, frozenset(old.keys() - new.keys()))
+
+
 class PlanWriter:
     """
     This class contains methods that writes the Clockwork plans to a production datastore
+
+    In diff mode the writer remembers the last plan it committed, and
+    overwrite_plan() only hands the assignments that were inserted,
+    updated or deleted since to write_changes(). Subclasses write them in
+    batches of at most `batch_size`.
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, diff: bool = False, batch_size: int = 1000) -> None:
+        self.diff = diff
+        self.batch_size = batch_size
+        # None until the committed plan has been read back from the datastore
+        self._committed: Optional[UnixtimeAssignments] = None
 
     async def overwrite_plan(self, plan: UnixtimeAssignments) -> None:
-        logger.debug(f'Final Plan: {plan}')
+        if not self.diff:
+            await self.write_plan(plan)
+            self._committed = dict(plan)
+            return
+        changes = diff_plans(await self.committed_plan(), plan)
+        instrumentation.increment("plan_writer.inserts", len(changes.inserts))
+        instrumentation.increment("plan_writer.updates", len(changes.updates))
+        instrumentation.increment("plan_writer.deletes", len(changes.deletes))
+        if changes:
+            await self.write_changes(changes)
+        # Only once the changes are written, so that a failed write is
+        # retried in full by the next run
+        self._committed = dict(plan)
+
+    async def committed_plan(self) -> UnixtimeAssignments:
+        """
+        The last plan written by this writer, or else the one read back
+        from the datastore
+        """
+        if self._committed is None:
+            self._committed = await self.read_plan()
+        return self._committed
+
+    async def write_plan(self, plan: UnixtimeAssignments) -> None:
+        logger.debug('Final Plan: %s', plan)
+
+    async def read_plan(self) -> UnixtimeAssignments:
+        """
+        The plan currently in the datastore, which the first diff is
+        computed against
+        """
+        return {}
+
+    async def write_changes(self, changes: PlanDiff) -> None:
+        logger.debug(
+            'Plan Changes | Inserts: %s | Updates: %s | Deletes: %s',
+            changes.inserts, changes.updates, set(changes.deletes),
+        )
+
+
+class SQLitePlanWriter(PlanWriter):
+    """
+    Writes plans to a table of a local SQLite file, the reference for
+    production datastores. Every write is a single transaction, with rows
+    sent by executemany() in batches of `batch_size`.
+    """
+
+    def __init__(
+        self, path: str, diff: bool = True, batch_size: int = 10000, table: str = "plan"
+    ) -> None:
+        super().__init__(diff=diff, batch_size=batch_size)
+        self.path = path
+        self.table = table
+        with sqlite_transaction(self.path) as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "task_id TEXT NOT NULL, "
+                "period_id INTEGER NOT NULL, "
+                "dispatch_time INTEGER NOT NULL, "
+                "PRIMARY KEY (task_id, period_id))"
+            )
+
+    async def write_plan(self, plan: UnixtimeAssignments) -> None:
+        rows = [
+            (task.task_id, task.period_id.unixtime, time.unixtime)
+            for task, time in plan.items()
+        ]
+        await run_blocking(self._write_plan, rows)
+
+    async def read_plan(self) -> UnixtimeAssignments:
+        return await run_blocking(self._read_plan)
+
+    async def write_changes(self, changes: PlanDiff) -> None:
+        await run_blocking(self._write_changes, changes)
+
+    def _write_plan(self, rows: List[Tuple[str, int, int]]) -> None:
+        with sqlite_transaction(self.path) as connection:
+            connection.execute(f"DELETE FROM {self.table}")
+            for batch in _batches(rows, self.batch_size):
+                connection.executemany(
+                    f"INSERT INTO {self.table} VALUES (?, ?, ?)", batch
+                )
+
+    def _read_plan(self) -> UnixtimeAssignments:
+        timestamps: Dict[int, Timestamp] = {}
+        with sqlite_transaction(self.path) as connection:
+            rows = connection.execute(
+                f"SELECT task_id, period_id, dispatch_time FROM {self.table}"
+            ).fetchall()
+        plan = {}
+        for task_id, period_id, dispatch_time in rows:
+            if period_id not in timestamps:
+                timestamps[period_id] = Timestamp(period_id)
+            if dispatch_time not in timestamps:
+                timestamps[dispatch_time] = Timestamp(dispatch_time)
+            plan[TaskInstance(task_id, timestamps[period_id])] = timestamps[dispatch_time]
+        return plan
+
+    def _write_changes(self, changes: PlanDiff) -> None:
+        with sqlite_transaction(self.path) as connection:
+            for batch in _batches(
+                ((task.task_id, task.period_id.unixtime) for task in changes.deletes),
+                self.batch_size,
+            ):
+                connection.executemany(
+                    f"DELETE FROM {self.table} WHERE task_id = ? AND period_id = ?", batch
+                )
+            for batch in _batches(
+                (
+                    (task.task_id, task.period_id.unixtime, time.unixtime)
+                    for task, time in changes.inserts.items()
+                ),
+                self.batch_size,
+            ):
+                connection.executemany(
+                    f"INSERT INTO {self.table} VALUES (?, ?, ?)", batch
+                )
+            for batch in _batches(
+                (
+                    (time.unixtime, task.task_id, task.period_id.unixtime)
+                    for task, time in changes.updates.items()
+                ),
+                self.batch_size,
+            ):
+                connection.executemany(
+                    f"UPDATE {self.table} SET dispatch_time = ? "
+                    "WHERE task_id = ? AND period_id = ?",
+                    batch,
+                )
+
+
+def _batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
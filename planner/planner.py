@@ -6,41 +6,135 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import sys
 import traceback
+from typing import AsyncIterator, Dict, FrozenSet, Optional, Set
 
-from common.data_types import UnixtimeAssignments
+from common import instrumentation, pipeline
+from common.data_types import TaskInstance, UnixtimeAssignments
+from common.instrumentation import RunReport
 from planner.config import PlannerConfig, TaskPoolConfig
 
 __ALL__ = ["Planner"]
 
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
 logger: logging.Logger = logging.getLogger(__name__)
 
 
 class Planner:
+    """
+    Plans every task pool of the config concurrently, at most
+    max_concurrent_pools at a time, and writes their plans together in a
+    single write.
+
+    A pool that fails doesn't stop the others. It keeps the plan of its
+    last successful run, so that the write leaves its assignments as they
+    were. When it hasn't run successfully since the planner started, every
+    committed assignment the other pools don't replace is kept instead, at
+    the cost of not deleting their stale assignments on that run.
+    """
+
     def __init__(self, config: PlannerConfig) -> None:
         self.config: PlannerConfig = config
+        # The instrumentation report of the most recent run
+        self.last_report: RunReport = {}
+        # The plan of the last successful run of each pool
+        self._pool_plans: Dict[str, UnixtimeAssignments] = {}
 
     async def run(self) -> int:
         ret_code = 0
-        try:
-            pool = self.config.task_pool
-            plan = await self.execute_task_pool(pool)
-            await self.config.plan_writer.overwrite_plan(plan)
-        except Exception:
-            etype, value, tb = sys.exc_info()
-            traceback.print_exception(etype, value, tb)
-            ret_code = 1
+        sink = self.config.instrumentation
+        sink.begin_run()
+        with instrumentation.use_sink(sink):
+            semaphore = asyncio.Semaphore(self.config.max_concurrent_pools)
+            pool_plans = await asyncio.gather(*(
+                self._run_task_pool(name, pool, semaphore)
+                for name, pool in self.config.task_pools.items()
+            ))
+            plan = {}
+            keep_committed = False
+            for name, pool_plan in zip(self.config.task_pools, pool_plans):
+                if pool_plan is None:
+                    ret_code = 1
+                    if name in self._pool_plans:
+                        pool_plan = self._pool_plans[name]
+                    else:
+                        # No earlier run of this pool in this process, so
+                        # there's no telling which assignments are its own
+                        keep_committed = True
+                        continue
+                else:
+                    self._pool_plans[name] = pool_plan
+                plan.update(pool_plan)
+            try:
+                with instrumentation.timer("planner.write"):
+                    plan_writer = self.config.plan_writer
+                    if keep_committed:
+                        for task, time in (await plan_writer.committed_plan()).items():
+                            plan.setdefault(task, time)
+                    await plan_writer.overwrite_plan(plan)
+            except Exception:
+                etype, value, tb = sys.exc_info()
+                traceback.print_exception(etype, value, tb)
+                ret_code = 1
+        self.last_report = sink.end_run()
+        if self.last_report:
+            logger.debug("Run Report: %s", self.last_report)
         return ret_code
 
+    def close(self) -> None:
+        # Pools may share an algorithm
+        algorithms = {
+            id(pool.scheduling_algorithm): pool.scheduling_algorithm
+            for pool in self.config.task_pools.values()
+        }
+        for algorithm in algorithms.values():
+            algorithm.close()
+
+    async def _run_task_pool(
+        self, name: str, pool: TaskPoolConfig, semaphore: asyncio.Semaphore
+    ) -> Optional[UnixtimeAssignments]:
+        """
+        The pool's plan, or None if planning it failed
+        """
+        async with semaphore:
+            try:
+                with instrumentation.timer("planner.pool"):
+                    return await self.execute_task_pool(pool, name)
+            except Exception:
+                logger.error("Planning failed for task pool %s", name)
+                etype, value, tb = sys.exc_info()
+                traceback.print_exception(etype, value, tb)
+                instrumentation.increment("planner.pools_failed")
+                return None
+
     @staticmethod
-    async def execute_task_pool(pool: TaskPoolConfig) -> UnixtimeAssignments:
-        tasks = await pool.task_fetcher.fetch()
-        plan = await pool.scheduling_algorithm.run(tasks)
-        missing_from_plan = frozenset(tasks - set(plan.keys()))
+    async def execute_task_pool(
+        pool: TaskPoolConfig, name: Optional[str] = None,
+    ) -> UnixtimeAssignments:
+        # Batches are fetched in the background while the algorithm works on
+        # the previous ones. Fetchers may repeat an instance across batches.
+        tasks: Set[TaskInstance] = set()
+
+        async def fetch_batches() -> AsyncIterator[FrozenSet[TaskInstance]]:
+            batches = pool.task_fetcher.fetch_batches()
+            while True:
+                with instrumentation.timer("planner.fetch"):
+                    try:
+                        batch = await batches.__anext__()
+                    except StopAsyncIteration:
+                        return
+                tasks.update(batch)
+                yield batch
+
+        with instrumentation.timer("planner.schedule"):
+            plan = await pool.scheduling_algorithm.run_batches(
+                pipeline.buffered(fetch_batches(), pool.max_pending_batches), name
+            )
+        instrumentation.increment("planner.tasks", len(tasks))
         logger.debug(
-            f"Planning Finished | In Plan: {len(plan)} | Missing from Plan: {len(missing_from_plan)}",
+            "Planning Finished | In Plan: %d | Missing from Plan: %d",
+            len(plan), len(tasks - plan.keys()),
         )
         return plan
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Optional, Union
+
+
+__ALL__ = ["Registry"]
+
+
+class Registry:
+    """
+    Maps short names to implementations given as "module:attribute" paths,
+    and only imports an implementation's module once it's asked for, so
+    that a planner pays for the algorithms and fetchers it uses and no
+    others.
+
+    Besides the implementations registered here, third-party packages can
+    provide their own through the `entry_point_group` entry points, e.g. in
+    their pyproject.toml
+
+        [project.entry-points."clockwork.algorithms"]
+        my_algorithm = "my_package.algorithms:MyAlgorithm"
+
+    Any "module:attribute" path also works as a name.
+    """
+
+    def __init__(self, kind: str, entry_point_group: str, paths: Dict[str, str]) -> None:
+        self.kind = kind
+        self.entry_point_group = entry_point_group
+        self._paths: Dict[str, Union[str, Callable[..., Any]]] = dict(paths)
+        self._loaded: Dict[str, Callable[..., Any]] = {}
+        # Entry points are only looked up for names that aren't registered,
+        # reading them scans the metadata of every installed package
+        self._entry_points: Optional[Dict[str, Any]] = None
+
+    def register(self, short_name: str, target: Union[str, Callable[..., Any]]) -> None:
+        """
+        Registers a "module:attribute" path, or the implementation itself
+        """
+        self._paths[short_name] = target
+        self._loaded.pop(short_name, None)
+
+    def names(self) -> List[str]:
+        return sorted(self._paths.keys() | self._plugins().keys())
+
+    def get(self, short_name: str) -> Callable[..., Any]:
+        implementation = self._loaded.get(short_name)
+        if implementation is not None:
+            return implementation
+        target = self._paths.get(short_name)
+        if target is None:
+            entry_point = self._plugins().get(short_name)
+            if entry_point is not None:
+                target = entry_point.load()
+            elif ":" in short_name:
+                target = short_name
+            else:
+                raise KeyError(
+                    f"Unknown {self.kind} {short_name!r}, available: {', '.join(self.names())}"
+                )
+        if isinstance(target, str):
+            module_name, _, attribute = target.partition(":")
+            target = getattr(importlib.import_module(module_name), attribute)
+        self._loaded[short_name] = target
+        return target
+
+    def _plugins(self) -> Dict[str, Any]:
+        if self._entry_points is None:
+            from importlib import metadata
+
+            if sys.version_info >= (3, 10):
+                entry_points = metadata.entry_points(group=self.entry_point_group)
+            else:
+                entry_points = metadata.entry_points().get(self.entry_point_group, [])
+            self._entry_points = {entry_point.name: entry_point for entry_point in entry_points}
+        return self._entry_points
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import unittest
+from typing import List
+
+from common.time_interval import Seconds
+from planner.daemon import PlannerDaemon
+
+
+class FakePlanner:
+    """
+    Stands in for a Planner, each run takes `durations[i]` seconds
+    """
+
+    def __init__(self, durations: List[float]) -> None:
+        self.durations = durations
+        self.runs = 0
+
+    async def run(self) -> int:
+        duration = self.durations[min(self.runs, len(self.durations) - 1)]
+        self.runs += 1
+        await asyncio.sleep(duration)
+        return 0
+
+
+class TestPlannerDaemon(unittest.TestCase):
+
+    def test_max_cycles(self) -> None:
+        planner = FakePlanner([0])
+        daemon = PlannerDaemon(planner, Seconds(1))  # pyre-ignore[6]
+        self.assertEqual(asyncio.run(daemon.run(max_cycles=2)), 0)
+        self.assertEqual(planner.runs, 2)
+        self.assertEqual(daemon.cycles_skipped, 0)
+        with self.assertRaises(ValueError):
+            PlannerDaemon(planner, Seconds(0))  # pyre-ignore[6]
+
+    def test_overrun_skips_cycles(self) -> None:
+        # Cycles are due at 0s, 1s, 2s... the first one runs until 1.5s, so
+        # the one at 1s is skipped and the second one starts at 2s
+        planner = FakePlanner([1.5, 0])
+        daemon = PlannerDaemon(planner, Seconds(1))  # pyre-ignore[6]
+
+        async def run() -> float:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await daemon.run(max_cycles=2)
+            return loop.time() - start
+
+        elapsed = asyncio.run(run())
+        self.assertEqual(daemon.cycles_skipped, 1)
+        self.assertGreaterEqual(elapsed, 2)
+
+    def test_sigterm_finishes_the_cycle(self) -> None:
+        planner = FakePlanner([0])
+        daemon = PlannerDaemon(planner, Seconds(3600))  # pyre-ignore[6]
+
+        async def run() -> int:
+            asyncio.get_running_loop().call_later(0.05, os.kill, os.getpid(), signal.SIGTERM)
+            return await daemon.run()
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(planner.runs, 1)
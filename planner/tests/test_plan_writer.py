@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from common.data_types import TaskInstance
+from common.instrumentation import RecordingSink, use_sink
+from common.timestamp import Timestamp
+from planner.plan_writer import SQLitePlanWriter, diff_plans
+
+
+def task(task_id: str) -> TaskInstance:
+    return TaskInstance(task_id, Timestamp(0))
+
+
+class TestPlanWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "plan.db")
+        self.first = {task(f"task_{i}"): Timestamp(i) for i in range(10)}
+        self.second = dict(self.first)
+        del self.second[task("task_0")]
+        self.second[task("task_1")] = Timestamp(100)
+        self.second[task("task_10")] = Timestamp(10)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_diff_plans(self) -> None:
+        changes = diff_plans(self.first, self.second)
+        self.assertEqual(changes.inserts, {task("task_10"): Timestamp(10)})
+        self.assertEqual(changes.updates, {task("task_1"): Timestamp(100)})
+        self.assertEqual(changes.deletes, frozenset([task("task_0")]))
+        self.assertEqual(len(diff_plans(self.second, dict(self.second))), 0)
+
+    def test_sqlite_diff(self) -> None:
+        writer = SQLitePlanWriter(self.path, batch_size=3)
+        sink = RecordingSink()
+        asyncio.run(writer.overwrite_plan(self.first))
+        with use_sink(sink):
+            asyncio.run(writer.overwrite_plan(self.second))
+        self.assertEqual(asyncio.run(writer.read_plan()), self.second)
+        self.assertEqual(sink.counters["plan_writer.inserts"], 1)
+        self.assertEqual(sink.counters["plan_writer.updates"], 1)
+        self.assertEqual(sink.counters["plan_writer.deletes"], 1)
+
+        # A new writer diffs against what the file holds
+        sink = RecordingSink()
+        with use_sink(sink):
+            asyncio.run(SQLitePlanWriter(self.path).overwrite_plan(self.second))
+        self.assertEqual(sink.counters["plan_writer.inserts"], 0)
+        self.assertEqual(sink.counters["plan_writer.updates"], 0)
+
+    def test_sqlite_overwrite(self) -> None:
+        writer = SQLitePlanWriter(self.path, diff=False, batch_size=3)
+        asyncio.run(writer.overwrite_plan(self.first))
+        asyncio.run(writer.overwrite_plan(self.second))
+        self.assertEqual(asyncio.run(writer.read_plan()), self.second)
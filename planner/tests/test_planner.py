@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import AsyncIterator, FrozenSet, List
+
+from algorithm.algorithm import ReturnZero
+from algorithm.task_fetchers import TaskFetcher
+from common.data_types import TaskInstance, UnixtimeAssignments
+from common.instrumentation import RecordingSink, use_sink
+from common.timestamp import Timestamp
+from planner.config import PlannerConfig, TaskPoolConfig
+from planner.plan_writer import PlanWriter, SQLitePlanWriter
+from planner.planner import Planner
+
+
+class RecordingPlanWriter(PlanWriter):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.plans: List[UnixtimeAssignments] = []
+
+    async def write_plan(self, plan: UnixtimeAssignments) -> None:
+        self.plans.append(plan)
+
+
+class SlowTaskFetcher(TaskFetcher):
+    running = 0
+    max_running = 0
+
+    def __init__(self, task_id: str, fail: bool = False) -> None:
+        self.task_id = task_id
+        self.fail = fail
+
+    async def fetch(self) -> FrozenSet[TaskInstance]:
+        SlowTaskFetcher.running += 1
+        SlowTaskFetcher.max_running = max(SlowTaskFetcher.max_running, SlowTaskFetcher.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError(f"{self.task_id} is down")
+            return frozenset([TaskInstance(self.task_id, Timestamp(0))])
+        finally:
+            SlowTaskFetcher.running -= 1
+
+
+class RepeatingTaskFetcher(TaskFetcher):
+    """
+    Yields the same instance in two batches, like a dump listing it twice
+    """
+
+    async def fetch_batches(self) -> AsyncIterator[FrozenSet[TaskInstance]]:
+        yield frozenset([TaskInstance("a", Timestamp(0)), TaskInstance("b", Timestamp(0))])
+        yield frozenset([TaskInstance("a", Timestamp(0))])
+
+
+class TestPlanner(unittest.TestCase):
+
+    def setUp(self) -> None:
+        SlowTaskFetcher.max_running = 0
+        self.writer = RecordingPlanWriter()
+        self.fetchers = {name: SlowTaskFetcher(name) for name in ["a", "b", "c", "d"]}
+        self.config = PlannerConfig(
+            plan_writer=self.writer,
+            task_pools={
+                name: TaskPoolConfig(fetcher, ReturnZero())
+                for name, fetcher in self.fetchers.items()
+            },
+            max_concurrent_pools=2,
+        )
+
+    def test_pools_share_one_write(self) -> None:
+        self.assertEqual(asyncio.run(Planner(self.config).run()), 0)
+        self.assertEqual(len(self.writer.plans), 1)
+        self.assertEqual(
+            sorted(task.task_id for task in self.writer.plans[0]), ["a", "b", "c", "d"]
+        )
+        self.assertEqual(SlowTaskFetcher.max_running, 2)
+
+    def test_failed_pool_keeps_its_last_plan(self) -> None:
+        planner = Planner(self.config)
+        asyncio.run(planner.run())
+        self.fetchers["b"].fail = True
+        self.fetchers["c"].task_id = "c2"
+        self.assertEqual(asyncio.run(planner.run()), 1)
+        self.assertEqual(
+            sorted(task.task_id for task in self.writer.plans[1]), ["a", "b", "c2", "d"]
+        )
+
+    def test_failed_pool_after_a_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plan.db")
+            self.config.plan_writer = SQLitePlanWriter(path)
+            asyncio.run(Planner(self.config).run())
+            # A new process, whose first run of pool b fails
+            self.config.plan_writer = SQLitePlanWriter(path)
+            self.fetchers["b"].fail = True
+            self.fetchers["c"].task_id = "c2"
+            self.assertEqual(asyncio.run(Planner(self.config).run()), 1)
+            plan = asyncio.run(SQLitePlanWriter(path).read_plan())
+        self.assertIn(TaskInstance("b", Timestamp(0)), plan)
+        self.assertIn(TaskInstance("c2", Timestamp(0)), plan)
+
+    def test_tasks_are_counted_once(self) -> None:
+        sink = RecordingSink()
+        with use_sink(sink):
+            plan = asyncio.run(
+                Planner.execute_task_pool(TaskPoolConfig(RepeatingTaskFetcher(), ReturnZero()))
+            )
+        self.assertEqual(len(plan), 2)
+        self.assertEqual(sink.counters["planner.tasks"], 2)
+
+    def test_single_pool_config(self) -> None:
+        config = PlannerConfig(SlowTaskFetcher("a"), ReturnZero(), self.writer)
+        self.assertEqual(list(config.task_pools), ["default"])
+        self.assertEqual(config.task_pool.task_fetcher.task_id, "a")
+        with self.assertRaises(ValueError):
+            PlannerConfig(SlowTaskFetcher("a"))
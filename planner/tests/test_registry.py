@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import unittest
+
+from algorithm.algorithm import NullAlgorithm, ReturnZero
+from planner.config import ALGORITHMS, get_algorithm
+from planner.registry import Registry
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_lazy_imports(self) -> None:
+        # A fresh interpreter, this one has imported everything already
+        imported = subprocess.check_output(
+            [
+                sys.executable, "-c",
+                "import sys, planner.config; "
+                "planner.config.get_task_fetcher('hard_coded'); "
+                "print(' '.join(sorted(sys.modules)))",
+            ],
+            text=True,
+        ).split()
+        self.assertIn("algorithm.task_fetchers", imported)
+        self.assertNotIn("algorithm.algorithm", imported)
+        self.assertNotIn("numpy", imported)
+
+    def test_lookup(self) -> None:
+        self.assertIsInstance(get_algorithm("do_nothing"), NullAlgorithm)
+        self.assertIs(ALGORITHMS.get("algorithm.algorithm:ReturnZero"), ReturnZero)
+        with self.assertRaisesRegex(KeyError, "right_based"):
+            get_algorithm("missing")
+
+    def test_register(self) -> None:
+        registry = Registry("algorithm", "clockwork.tests", {})
+        registry.register("zero", "algorithm.algorithm:ReturnZero")
+        self.assertIs(registry.get("zero"), ReturnZero)
+        registry.register("zero", NullAlgorithm)
+        self.assertIs(registry.get("zero"), NullAlgorithm)
+        self.assertEqual(registry.names(), ["zero"])